@@ -1,5 +1,12 @@
-from .main import run_collection_system
-
 __version__ = "1.0.0"
 __all__ = ["run_collection_system"]
 
+
+def __getattr__(name):
+    # main pulls in the keyboard and gamepad controllers, which need a display. Importing it only on use lets the
+    # recording and replay tools run on headless machines.
+    if name == "run_collection_system":
+        from .main import run_collection_system
+
+        return run_collection_system
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
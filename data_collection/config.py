@@ -14,3 +14,19 @@ MAX_EPISODE_STEPS = 10000
 CONTROL_RATE_HZ = 50
 DEAD_ZONE_THRESHOLD = 0.15
 
+
+# "store" saves sessions as chunked episode store directories, "npz" as a single .npz archive
+STORAGE_FORMAT = "store"
+# Chunk codec for the episode store ("zstd", "lz4", "zlib", "none"), None picks the fastest available.
+# "none" chunks are memory-mapped on replay instead of decompressed.
+STORE_CODEC = None
+
+# Fourcc used to store camera streams as video ("mp4v", "MJPG", ...), None keeps raw frames in the recording
+VIDEO_CODEC = None
+
+# Steps between simulator state snapshots stored in recordings, used to seek during replay
+SNAPSHOT_INTERVAL = 250
+
+# Control steps each camera frame is held for (int, or a dict per camera such as {"camera_front": 4, "camera_top": 10}).
+# At CONTROL_RATE_HZ = 50, a period of 4 renders the cameras at 12.5 Hz; steps in between reuse the last frame.
+CAMERA_RENDER_PERIOD = 1
@@ -1,7 +1,16 @@
-from .keyboard import KeyboardController
-from .gamepad import GamepadController
 from .watch import WatchController
 
-__all__ = ["KeyboardController", "GamepadController", "WatchController"]
+__all__ = ["GamepadController", "KeyboardController", "WatchController"]
 
 
+def __getattr__(name):
+    # pynput needs a display and pygame may be missing, only import them when the controller is asked for
+    if name == "KeyboardController":
+        from .keyboard import KeyboardController
+
+        return KeyboardController
+    if name == "GamepadController":
+        from .gamepad import GamepadController
+
+        return GamepadController
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
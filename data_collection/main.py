@@ -3,12 +3,15 @@ import gymnasium as gym
 from rich.console import Console
 from rich.panel import Panel
 from rich.live import Live
+from rich.prompt import Confirm
 
 import gym_lowcostrobot
-from .config import MAX_EPISODE_STEPS
+from .config import MAX_EPISODE_STEPS, CONTROL_RATE_HZ, VIDEO_CODEC, STORAGE_FORMAT, STORE_CODEC, SNAPSHOT_INTERVAL
+from .config import CAMERA_RENDER_PERIOD
 from .ui import show_welcome, select_environment, select_control_method, select_recording, create_status_display
 from .controllers import KeyboardController, GamepadController, WatchController
-from .recording import DataRecorder
+from .recording import DataRecorder, find_journals, recover_journal
+from .recording.snapshots import capture_state
 from .replay import list_recordings, load_recording, ReplayController
 from .camera_viewer import CameraViewer
 
@@ -37,6 +40,8 @@ def run_collection_system():
     
     if not KEYBOARD_AVAILABLE and not CONTROLLER_AVAILABLE:
         console.print("[bold red]Please install: pip install pynput pygame[/bold red]\n")
+
+    _recover_journals()
     
     recordings = list_recordings()
     has_recordings = len(recordings) > 0
@@ -70,8 +75,58 @@ def run_collection_system():
     console.print("\n[bold green]✓ Data collection session ended[/bold green]\n")
 
 
+def _recover_journals():
+    journals = find_journals()
+    if not journals:
+        return
+
+    console.print(f"[yellow]⚠️  Found {len(journals)} unfinished session journal(s) from a crashed session[/yellow]")
+    if not Confirm.ask("[bold cyan]Recover them now?[/bold cyan]", default=True):
+        console.print("[dim]Recover later with: python -m data_collection.recording.journal[/dim]\n")
+        return
+
+    for journal_path in journals:
+        try:
+            filepath = recover_journal(journal_path, delete=True)
+        except Exception as e:
+            console.print(f"[bold red]Error recovering {journal_path.name}: {e}[/bold red]")
+            continue
+        if filepath:
+            console.print(f"[bold green]✓[/bold green] Recovered [cyan]{filepath.name}[/cyan]")
+    console.print()
+
+
+def _create_recorder(env, env_name, control_method):
+    return DataRecorder(
+        env_name,
+        control_method,
+        video_codec=VIDEO_CODEC,
+        video_fps=CONTROL_RATE_HZ,
+        storage_format=STORAGE_FORMAT,
+        store_codec=STORE_CODEC,
+        state_fn=lambda: capture_state(env),
+        snapshot_interval=SNAPSHOT_INTERVAL,
+    )
+
+
+def _path_size(path):
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    return path.stat().st_size
+
+
 def _run_collection(env_name, control_method, recording_data=None):
-    env = gym.make(env_name, render_mode="human", action_mode="joint", observation_mode="both")
+    # Images are rendered lazily, only when the recorder or the camera viewer reads them, into double buffers.
+    # Every consumer copies or displays a frame within the step it was rendered at.
+    env = gym.make(
+        env_name,
+        render_mode="human",
+        action_mode="joint",
+        observation_mode="both",
+        camera_render_period=CAMERA_RENDER_PERIOD,
+        lazy_images=True,
+        image_buffers=2,
+    )
     
     if hasattr(env, '_max_episode_steps'):
         env._max_episode_steps = MAX_EPISODE_STEPS
@@ -85,11 +140,11 @@ def _run_collection(env_name, control_method, recording_data=None):
         recorder = None
     elif control_method == "keyboard":
         controller = KeyboardController(env)
-        recorder = DataRecorder(env_name, control_method)
+        recorder = _create_recorder(env, env_name, control_method)
         recorder.start_episode()
     elif control_method == "controller":
         controller = GamepadController(env)
-        recorder = DataRecorder(env_name, control_method)
+        recorder = _create_recorder(env, env_name, control_method)
         recorder.start_episode()
     else:
         controller = WatchController(env)
@@ -97,76 +152,82 @@ def _run_collection(env_name, control_method, recording_data=None):
     
     layout = create_status_display(control_method)
     
-    with Live(layout, console=console, screen=True, refresh_per_second=4):
-        while not controller.should_exit():
-            if controller.should_reset():
-                if recorder:
-                    recorder.end_episode()
-                    recorder.start_episode()
-                
-                observation, info = env.reset()
-                controller.episode += 1
-            
-            action = controller.get_action(observation)
-            observation, reward, terminated, truncated, info = env.step(action)
-            
-            controller.reward = reward
-            
-            if recorder:
-                recorder.record_step(observation, action, reward)
-            
-            if hasattr(controller, 'current_observation') and controller.current_observation:
-                camera_viewer.update(controller.current_observation)
-            else:
-                camera_viewer.update(observation)
-            
-            status_text = controller.get_status_text()
-            layout["status"].update(Panel(status_text, border_style="green"))
-            
-            if terminated or truncated:
+    try:
+        with Live(layout, console=console, screen=True, refresh_per_second=4):
+            while not controller.should_exit():
+                if controller.should_reset():
+                    if recorder:
+                        recorder.end_episode()
+
+                    observation, info = env.reset()
+                    controller.episode += 1
+
+                    if recorder:
+                        recorder.start_episode()
+
+                action = controller.get_action(observation)
+                observation, reward, terminated, truncated, info = env.step(action)
+
+                controller.reward = reward
+
                 if recorder:
-                    recorder.end_episode()
-                    recorder.start_episode()
-                
-                observation, info = env.reset()
-                controller.episode += 1
-            
-            if hasattr(controller, 'tick'):
-                controller.tick()
-            else:
-                time.sleep(0.01)
-    
-    controller.cleanup()
-    camera_viewer.close()
-    env.close()
-    
-    if recorder:
-        console.print("\n[dim]Finalizing data collection...[/dim]")
-        recorder.end_episode()
-        
-        total_steps = recorder.get_total_steps()
-        num_episodes = len(recorder.episodes)
-        
-        has_images = False
-        if num_episodes > 0:
-            first_ep = recorder.episodes[0]
-            has_images = "images_front" in first_ep or "images_top" in first_ep
-        
-        console.print(f"[dim]Debug: Episodes={num_episodes}, Steps={total_steps}, Images={has_images}[/dim]")
-        
-        if num_episodes > 0 and total_steps > 0:
-            filepath = recorder.save()
-            if filepath:
-                import os
-                file_size_mb = os.path.getsize(filepath) / (1024 * 1024)
-                
-                console.print(f"\n[bold green]✓ Data saved:[/bold green] [cyan]{filepath.name}[/cyan]")
-                console.print(f"[dim]Location: {filepath}[/dim]")
-                console.print(f"[dim]Episodes: {num_episodes} | Steps: {total_steps} | Size: {file_size_mb:.2f} MB[/dim]")
-                if has_images:
-                    console.print(f"[dim]✓ Camera images included (Front + Top)[/dim]")
-            else:
-                console.print("\n[bold red]❌ Failed to save data![/bold red]")
-        else:
-            console.print(f"\n[yellow]⚠️  No data collected (Episodes: {num_episodes}, Steps: {total_steps})[/yellow]")
+                    recorder.record_step(observation, action, reward)
+
+                if hasattr(controller, 'current_observation') and controller.current_observation:
+                    camera_viewer.update(controller.current_observation)
+                else:
+                    camera_viewer.update(observation)
+
+                status_text = controller.get_status_text()
+                layout["status"].update(Panel(status_text, border_style="green"))
+
+                if terminated or truncated:
+                    if recorder:
+                        recorder.end_episode()
+
+                    observation, info = env.reset()
+                    controller.episode += 1
+
+                    if recorder:
+                        recorder.start_episode()
 
+                if hasattr(controller, 'tick'):
+                    controller.tick()
+                else:
+                    time.sleep(0.01)
+    finally:
+        # Runs on exceptions too, so a crashed loop still saves every finished episode
+        controller.cleanup()
+        camera_viewer.close()
+        env.close()
+
+        if recorder:
+            _finalize_recording(recorder)
+
+
+def _finalize_recording(recorder):
+    console.print("\n[dim]Finalizing data collection...[/dim]")
+    recorder.end_episode()
+
+    total_steps = recorder.get_total_steps()
+    num_episodes = recorder.num_episodes
+    has_images = recorder.has_images
+
+    console.print(f"[dim]Debug: Episodes={num_episodes}, Steps={total_steps}, Images={has_images}[/dim]")
+
+    if num_episodes > 0 and total_steps > 0:
+        filepath = recorder.save()
+        if filepath:
+            file_size_mb = _path_size(filepath) / (1024 * 1024)
+
+            console.print(f"\n[bold green]✓ Data saved:[/bold green] [cyan]{filepath.name}[/cyan]")
+            console.print(f"[dim]Location: {filepath}[/dim]")
+            console.print(f"[dim]Episodes: {num_episodes} | Steps: {total_steps} | Size: {file_size_mb:.2f} MB[/dim]")
+            if has_images:
+                console.print(f"[dim]✓ Camera images included (Front + Top)[/dim]")
+        else:
+            console.print("\n[bold red]❌ Failed to save data![/bold red]")
+    else:
+        # Nothing to save, the journal would otherwise be offered for recovery on every launch
+        recorder.close_journal(delete=True)
+        console.print(f"\n[yellow]⚠️  No data collected (Episodes: {num_episodes}, Steps: {total_steps})[/yellow]")
@@ -1,4 +1,5 @@
+from .journal import find_journals, recover_journal
 from .recorder import DataRecorder
 
-__all__ = ["DataRecorder"]
+__all__ = ["DataRecorder", "find_journals", "recover_journal"]
 
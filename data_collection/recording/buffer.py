@@ -0,0 +1,64 @@
+import numpy as np
+
+
+class ColumnBuffer:
+    def __init__(self, dtype=None, capacity=64):
+        self.dtype = dtype
+        self.capacity = max(1, int(capacity))
+        self._data = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, value):
+        value = np.asarray(value, dtype=self.dtype)
+        if self._data is None:
+            # The first row fixes the per-step shape; storage is allocated once for `capacity` rows
+            self._data = np.empty((self.capacity,) + value.shape, dtype=value.dtype)
+        elif self._size == len(self._data):
+            self._grow()
+
+        self._data[self._size] = value
+        self._size += 1
+
+    def last(self):
+        # Rows are never rewritten, so this view stays valid even after the column grows
+        return self._data[self._size - 1]
+
+    def view(self):
+        if self._data is None:
+            return np.empty((0,), dtype=self.dtype)
+        return self._data[:self._size]
+
+    def _grow(self):
+        # Doubling keeps the amortized cost of an append constant
+        grown = np.empty((2 * len(self._data),) + self._data.shape[1:], dtype=self._data.dtype)
+        grown[:self._size] = self._data[:self._size]
+        self._data = grown
+
+
+class EpisodeBuffer:
+    def __init__(self, dtypes, capacity=64):
+        self.dtypes = dict(dtypes)
+        self.capacity = capacity
+        self.columns = {}
+
+    def __len__(self):
+        return len(self.columns["observations"]) if "observations" in self.columns else 0
+
+    def __contains__(self, name):
+        return name in self.columns and len(self.columns[name]) > 0
+
+    def append(self, name, value):
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[name] = ColumnBuffer(self.dtypes.get(name), self.capacity)
+        column.append(value)
+
+    def last(self, name):
+        return self.columns[name].last()
+
+    def arrays(self):
+        # Views into the preallocated storage, valid until the buffer is discarded
+        return {name: column.view() for name, column in self.columns.items() if len(column) > 0}
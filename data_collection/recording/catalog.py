@@ -0,0 +1,39 @@
+import json
+from pathlib import Path
+
+from . import store
+
+CATALOG_FILE = "catalog.json"
+CATALOG_VERSION = 1
+
+
+def _signature_path(filepath):
+    # A store is only complete once metadata.json is written, so its stat stands for the whole recording
+    filepath = Path(filepath)
+    return filepath / store.METADATA_FILE if filepath.is_dir() else filepath
+
+
+def recording_signature(filepath):
+    stat = _signature_path(filepath).stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_catalog(data_dir):
+    try:
+        with open(Path(data_dir) / CATALOG_FILE) as f:
+            catalog = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if catalog.get("version") != CATALOG_VERSION:
+        return {}
+    return catalog.get("recordings", {})
+
+
+def save_catalog(data_dir, entries):
+    store.write_json(Path(data_dir) / CATALOG_FILE, {"version": CATALOG_VERSION, "recordings": entries})
+
+
+def update_catalog(data_dir, filepath, info):
+    entries = load_catalog(data_dir)
+    entries[Path(filepath).name] = dict(info, signature=recording_signature(filepath))
+    save_catalog(data_dir, entries)
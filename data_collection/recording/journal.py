@@ -0,0 +1,258 @@
+import argparse
+import os
+import pickle
+import queue
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from .buffer import EpisodeBuffer
+from .store import EpisodeStore
+from .writer import NpzSink
+
+JOURNAL_SUFFIX = ".journal"
+
+# Every record is framed as <payload length, crc32 of payload> followed by the pickled payload
+_HEADER = struct.Struct("<II")
+
+
+def _record_size(record):
+    # Arrays dominate the size of a record, the rest is a few hundred bytes at most
+    payload = record[-1]
+    if isinstance(payload, dict):
+        return sum(getattr(value, "nbytes", 0) for value in payload.values())
+    return 0
+
+
+class SessionJournal:
+    def __init__(self, filepath, fsync_interval=1.0, max_pending_bytes=64 * 1024 * 1024):
+        self.filepath = Path(filepath)
+        self.fsync_interval = fsync_interval
+        self.max_pending_bytes = max_pending_bytes
+        self._file = open(self.filepath, "ab")  # noqa: SIM115, the writer thread owns and closes it
+        self._last_fsync = time.monotonic()
+        self._error = None
+
+        # Records are serialized and written on a background thread, the control loop only enqueues them.
+        # The queue is bounded by the bytes it holds, not by a record count: raw camera frames make records
+        # hundreds of times larger than state-only ones.
+        self._queue = queue.Queue()
+        self._pending_bytes = 0
+        self._space = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="SessionJournal", daemon=True)
+        self._thread.start()
+
+    def append(self, record):
+        if self._error is not None:
+            raise RuntimeError(f"Failed to write journal {self.filepath}: {self._error}")
+        size = _record_size(record)
+        with self._space:
+            # Only wait once the writer is that far behind, a record larger than the bound still goes through
+            self._space.wait_for(
+                lambda: self._pending_bytes == 0
+                or self._pending_bytes + size <= self.max_pending_bytes
+                or self._error is not None
+            )
+            self._pending_bytes += size
+        self._queue.put((record, size))
+
+    def close(self, delete=False):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if delete and self._error is None:
+            self.filepath.unlink(missing_ok=True)
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                record, size = item
+                payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+                self._file.write(_HEADER.pack(len(payload), zlib.crc32(payload)))
+                self._file.write(payload)
+
+                # Episode boundaries are always made durable, steps at most `fsync_interval` seconds late
+                if record[0] == "end_episode" or time.monotonic() - self._last_fsync >= self.fsync_interval:
+                    self._sync()
+                self._release(size)
+            self._sync()
+        except Exception as e:
+            self._error = e
+            self._release(0)
+            while (item := self._queue.get()) is not None:
+                self._release(item[1])
+        finally:
+            self._file.close()
+
+    def _release(self, size):
+        with self._space:
+            self._pending_bytes -= size
+            self._space.notify_all()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+
+
+def read_journal(filepath):
+    # Yields records up to the first truncated or corrupt one, which is where a crash cut the journal
+    with open(filepath, "rb") as f:
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, crc = _HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            yield pickle.loads(payload)
+
+
+def _read_frames(video_path, max_frames):
+    # Frames of a video the session never finalized, decoding stops at the first frame cut off by the crash
+    capture = cv2.VideoCapture(str(video_path))
+    frames = []
+    while len(frames) < max_frames:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    capture.release()
+    return frames
+
+
+def _rebuild_frames(arrays, videos, base_dir):
+    # Journals of video-encoded sessions hold no frames, they are decoded back from the session's videos
+    num_steps = len(arrays["actions"])
+    images = {}
+    for key, video_path in videos.items():
+        frames = _read_frames(base_dir / video_path, num_steps)
+        if frames:
+            images[key] = np.stack(frames)
+        else:
+            print(f"Warning: {video_path} could not be decoded, its episode is recovered without {key}")
+    if not images:
+        return arrays
+
+    # Steps past the last decodable frame are dropped, like the records after a torn one
+    num_steps = min(len(frames) for frames in images.values())
+    rebuilt = {key: value[:num_steps] for key, value in arrays.items() if key not in ("snapshots", "snapshot_steps")}
+    if "snapshot_steps" in arrays:
+        kept = arrays["snapshot_steps"] <= num_steps
+        rebuilt["snapshots"] = arrays["snapshots"][kept]
+        rebuilt["snapshot_steps"] = arrays["snapshot_steps"][kept]
+    rebuilt.update({key: frames[:num_steps] for key, frames in images.items()})
+    return rebuilt
+
+
+def find_journals(data_dir="collected_data"):
+    data_path = Path(data_dir)
+    if not data_path.exists():
+        return []
+    return sorted(data_path.glob(f"*{JOURNAL_SUFFIX}"))
+
+
+def recover_journal(journal_path, output_dir=None, delete=False):
+    journal_path = Path(journal_path)
+    output_dir = Path(output_dir) if output_dir is not None else journal_path.parent
+
+    records = read_journal(journal_path)
+    first = next(records, None)
+    if first is None:
+        # Empty journal of a session that died before its header was written, nothing to recover
+        journal_path.unlink()
+        return None
+    if first[0] != "session":
+        raise ValueError(f"{journal_path} does not start with a session record")
+    session = first[1]
+
+    # Recovered sessions get their own name so a partially written recording is never touched
+    session_name = f"{journal_path.stem}_recovered"
+    if session.get("storage_format", "store") == "npz":
+        sink = NpzSink(output_dir / f"{session_name}.npz")
+    else:
+        sink = EpisodeStore(output_dir / session_name, codec=session.get("store_codec"))
+
+    num_episodes = 0
+    episode_idx = None
+    buffer = EpisodeBuffer({})
+    # Videos of every episode by camera, paths relative to the journal
+    videos = {}
+
+    def write_episode(buffer, episode_idx):
+        arrays = _rebuild_frames(buffer.arrays(), videos.get(episode_idx, {}), journal_path.parent)
+        sink.write_episode(num_episodes, arrays)
+
+    for record in records:
+        if record[0] in ("step", "snapshot"):
+            if record[1] != episode_idx and len(buffer) > 0:
+                write_episode(buffer, episode_idx)
+                num_episodes += 1
+                buffer = EpisodeBuffer({})
+            elif record[0] == "snapshot" and len(buffer) == 0:
+                # A new start snapshot supersedes the one of an episode that never recorded a step
+                buffer = EpisodeBuffer({})
+            episode_idx = record[1]
+            for key, value in record[2].items():
+                buffer.append(key, value)
+        elif record[0] == "video":
+            videos.setdefault(record[1], {})[record[2]] = record[3]
+        elif record[0] == "end_episode" and len(buffer) > 0:
+            write_episode(buffer, episode_idx)
+            num_episodes += 1
+            buffer = EpisodeBuffer({})
+            episode_idx = None
+    if len(buffer) > 0:
+        write_episode(buffer, episode_idx)
+        num_episodes += 1
+
+    if num_episodes == 0:
+        # Header-only journal of a session that never recorded a step
+        journal_path.unlink()
+        return None
+
+    filepath = sink.finalize({
+        "env_name": session["env_name"],
+        "control_method": session["control_method"],
+        "num_episodes": num_episodes,
+        "timestamp": session["timestamp"],
+    })
+    if delete:
+        journal_path.unlink()
+    return filepath
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild recordings from session journals left by crashed sessions")
+    parser.add_argument("journals", nargs="*", help="journal files, defaults to every journal in --data-dir")
+    parser.add_argument("--data-dir", default="collected_data")
+    parser.add_argument("--output-dir", default=None, help="defaults to the journal's directory")
+    parser.add_argument("--delete", action="store_true", help="delete each journal once it has been recovered")
+    args = parser.parse_args()
+
+    journals = args.journals or find_journals(args.data_dir)
+    if not journals:
+        print("No journals to recover")
+    for journal_path in journals:
+        try:
+            filepath = recover_journal(journal_path, args.output_dir, delete=args.delete)
+        except Exception as e:
+            print(f"Error recovering {journal_path}: {e}")
+            continue
+        if filepath is None:
+            print(f"Nothing to recover in {journal_path}, deleted it")
+        else:
+            print(f"Recovered {journal_path} to {filepath}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,103 +2,202 @@ import numpy as np
 from datetime import datetime
 from pathlib import Path
 
+from .buffer import EpisodeBuffer
+from .catalog import update_catalog
+from .journal import JOURNAL_SUFFIX, SessionJournal
+from .store import EpisodeStore
+from .video import VideoStreamWriter
+from .writer import EpisodeWriter, NpzSink
+
+STEP_DTYPES = {
+    "observations": np.float32,
+    "actions": np.float32,
+    "rewards": np.float32,
+    "timestamps": np.float64,
+    "images_front": np.uint8,
+    "images_top": np.uint8,
+    "snapshots": np.float64,
+    "snapshot_steps": np.int64,
+}
+
 
 class DataRecorder:
-    def __init__(self, env_name, control_method, output_dir="collected_data"):
+    def __init__(self, env_name, control_method, output_dir="collected_data", video_codec=None, video_fps=50,
+                 storage_format="store", store_codec=None, journal=True, state_fn=None, snapshot_interval=250):
         self.env_name = env_name
         self.control_method = control_method
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
-        
-        self.episodes = []
-        self.current_episode = {
-            "observations": [],
-            "actions": [],
-            "rewards": [],
-            "timestamps": []
-        }
+
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        session_name = f"{self.env_name}_{self.control_method}_{self.timestamp}"
+
+        # "store" writes a chunked episode store directory, "npz" the legacy single archive
+        if storage_format == "store":
+            sink = EpisodeStore(self.output_dir / session_name, codec=store_codec)
+            video_dir = sink.path / "videos"
+        elif storage_format == "npz":
+            sink = NpzSink(self.output_dir / f"{session_name}.npz")
+            video_dir = self.output_dir / f"{session_name}_videos"
+        else:
+            raise ValueError("Invalid storage format, must be 'store' or 'npz'")
+        self.filepath = sink.filepath
+
+        # With a codec set, camera streams are encoded to video files alongside the recording
+        self.video_codec = video_codec
+        self.video_fps = video_fps
+        self.video_dir = video_dir
+        self.video_streams = {}
+
+        # Finished episodes are handed to a background writer instead of being kept in memory
+        self.writer = EpisodeWriter(sink)
+
+        # With a state_fn, a full simulator snapshot is stored at episode start and every `snapshot_interval` steps
+        # so replay can seek without re-simulating the whole episode
+        self.state_fn = state_fn
+        self.snapshot_interval = snapshot_interval
+
+        # Every step also goes to an append-only journal so a crashed session can be recovered
+        self.journal = None
+        if journal:
+            self.journal = SessionJournal(self.output_dir / f"{session_name}{JOURNAL_SUFFIX}")
+            self.journal.append(("session", {
+                "env_name": self.env_name,
+                "control_method": self.control_method,
+                "timestamp": self.timestamp,
+                "storage_format": storage_format,
+                "store_codec": store_codec,
+            }))
+        self.num_episodes = 0
+        self.total_steps = 0
+        self.has_images = False
+
+        self.current_episode = EpisodeBuffer(STEP_DTYPES)
         self.episode_start_time = None
-    
+
     def start_episode(self):
-        self.current_episode = {
-            "observations": [],
-            "actions": [],
-            "rewards": [],
-            "timestamps": [],
-            "images_front": [],
-            "images_top": []
-        }
+        # A fresh buffer per episode: the previous one is still owned by the writer.
+        # Sizing it from the last episode avoids regrowing on every reset.
+        self.current_episode = EpisodeBuffer(STEP_DTYPES, capacity=self.current_episode.capacity)
         self.episode_start_time = datetime.now()
-    
+        # Called right after env.reset(), this is the state step 0 is played from
+        self._record_snapshot(0)
+
+    def _record_snapshot(self, step):
+        if self.state_fn is None:
+            return
+        self.current_episode.append("snapshots", self.state_fn())
+        self.current_episode.append("snapshot_steps", step)
+        if self.journal is not None:
+            snapshot = {key: self.current_episode.last(key) for key in ("snapshots", "snapshot_steps")}
+            self.journal.append(("snapshot", self.num_episodes, snapshot))
+
     def record_step(self, observation, action, reward):
         if self.episode_start_time is None:
             self.start_episode()
-        
+
         timestamp = (datetime.now() - self.episode_start_time).total_seconds()
-        
-        self.current_episode["observations"].append(observation["arm_qpos"])
-        self.current_episode["actions"].append(action)
-        self.current_episode["rewards"].append(reward)
-        self.current_episode["timestamps"].append(timestamp)
-        
-        if "image_front" in observation:
-            self.current_episode["images_front"].append(observation["image_front"])
-        if "image_top" in observation:
-            self.current_episode["images_top"].append(observation["image_top"])
-    
+
+        self.current_episode.append("observations", observation["arm_qpos"])
+        self.current_episode.append("actions", action)
+        self.current_episode.append("rewards", reward)
+        self.current_episode.append("timestamps", timestamp)
+        step = {key: self.current_episode.last(key) for key in ("observations", "actions", "rewards", "timestamps")}
+
+        # Video-encoded frames are not journaled, recovery decodes them back from the videos
+        for key, camera in (("images_front", "image_front"), ("images_top", "image_top")):
+            if camera in observation:
+                image = self._record_image(key, observation[camera], timestamp)
+                if self.video_codec is None:
+                    step[key] = image
+
+        if self.journal is not None:
+            self.journal.append(("step", self.num_episodes, step))
+
+        # The state after step i is the one step i + 1 is played from
+        if self.state_fn is not None and len(self.current_episode) % self.snapshot_interval == 0:
+            self._record_snapshot(len(self.current_episode))
+
+    def _record_image(self, key, image, timestamp):
+        if self.video_codec is None:
+            self.current_episode.append(key, image)
+            return self.current_episode.last(key)
+
+        if key not in self.video_streams:
+            filepath = self.video_dir / f"episode_{self.num_episodes}_{key}"
+            self.video_streams[key] = VideoStreamWriter(filepath, codec=self.video_codec, fps=self.video_fps)
+            if self.journal is not None:
+                video_path = self.video_streams[key].filepath.relative_to(self.output_dir)
+                self.journal.append(("video", self.num_episodes, key, video_path))
+        # The env may render the next frames into the same buffer while this one waits in the encoder queue
+        self.video_streams[key].write(np.array(image), timestamp)
+
     def end_episode(self):
-        if len(self.current_episode["observations"]) > 0:
-            episode_data = {
-                "observations": np.array(self.current_episode["observations"]),
-                "actions": np.array(self.current_episode["actions"]),
-                "rewards": np.array(self.current_episode["rewards"]),
-                "timestamps": np.array(self.current_episode["timestamps"])
-            }
-            
-            if len(self.current_episode["images_front"]) > 0:
-                episode_data["images_front"] = np.array(self.current_episode["images_front"], dtype=np.uint8)
-            if len(self.current_episode["images_top"]) > 0:
-                episode_data["images_top"] = np.array(self.current_episode["images_top"], dtype=np.uint8)
-            
-            self.episodes.append(episode_data)
-    
+        if len(self.current_episode) > 0:
+            episode_data = self.current_episode.arrays()
+            # Streams are closed by the writer thread so flushing the encoder does not stall the reset
+            episode_data.update(self.video_streams)
+
+            self.writer.submit(self.num_episodes, episode_data)
+            if self.journal is not None:
+                self.journal.append(("end_episode", self.num_episodes))
+            self.num_episodes += 1
+            self.total_steps += len(episode_data["observations"])
+            self.has_images = self.has_images or "images_front" in episode_data or "images_top" in episode_data
+
+        # Detach the buffers so a repeated end_episode cannot write the same episode twice
+        self.video_streams = {}
+        capacity = max(len(self.current_episode), self.current_episode.capacity)
+        self.current_episode = EpisodeBuffer(STEP_DTYPES, capacity=capacity)
+
     def save(self):
-        if len(self.episodes) == 0:
+        try:
+            self.writer.close()
+        except Exception as e:
+            print(f"Error saving file: {e}")
+            return None
+
+        if self.num_episodes == 0:
             print(f"Warning: No episodes to save")
+            self.close_journal(delete=True)
             return None
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{self.env_name}_{self.control_method}_{timestamp}.npz"
-        filepath = self.output_dir / filename
-        
-        print(f"Saving {len(self.episodes)} episodes to {filepath}...")
-        
-        save_dict = {
+
+        print(f"Saving {self.num_episodes} episodes to {self.filepath}...")
+
+        metadata = {
             "env_name": self.env_name,
             "control_method": self.control_method,
-            "num_episodes": len(self.episodes),
-            "timestamp": timestamp,
+            "num_episodes": self.num_episodes,
+            "timestamp": self.timestamp,
         }
-        
-        for i, episode in enumerate(self.episodes):
-            save_dict[f"episode_{i}_observations"] = episode["observations"]
-            save_dict[f"episode_{i}_actions"] = episode["actions"]
-            save_dict[f"episode_{i}_rewards"] = episode["rewards"]
-            save_dict[f"episode_{i}_timestamps"] = episode["timestamps"]
-            
-            if "images_front" in episode:
-                save_dict[f"episode_{i}_images_front"] = episode["images_front"]
-            if "images_top" in episode:
-                save_dict[f"episode_{i}_images_top"] = episode["images_top"]
-        
+
         try:
-            np.savez_compressed(filepath, **save_dict)
+            filepath = self.writer.sink.finalize(metadata)
             print(f"Successfully saved to {filepath}")
-            return filepath
         except Exception as e:
             print(f"Error saving file: {e}")
             return None
-    
-    def get_total_steps(self):
-        return sum(len(ep["observations"]) for ep in self.episodes)
 
+        # Register the recording so listing it never has to open the payload
+        try:
+            update_catalog(self.output_dir, filepath, {
+                "env_name": self.env_name,
+                "control_method": self.control_method,
+                "num_episodes": self.num_episodes,
+                "total_steps": self.total_steps,
+                "timestamp": self.timestamp,
+            })
+        except Exception as e:
+            print(f"Warning: Could not update recording catalog: {e}")
+
+        # The recording is complete, the journal is no longer needed
+        self.close_journal(delete=True)
+        return filepath
+
+    def close_journal(self, delete=False):
+        if self.journal is not None:
+            self.journal.close(delete=delete)
+            self.journal = None
+
+    def get_total_steps(self):
+        return self.total_steps
@@ -0,0 +1,14 @@
+import numpy as np
+
+
+def capture_state(env):
+    return env.unwrapped.get_state()
+
+
+def restore_state(env, state):
+    env = env.unwrapped
+    state = np.asarray(state, dtype=np.float64)
+    # Older recordings only hold the MuJoCo state, the task attributes of the env are kept as they are
+    if len(state) < env.state_size:
+        state = np.concatenate([state, env.get_state()[len(state):]])
+    env.set_state(state)
@@ -0,0 +1,308 @@
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .video import VideoStreamWriter
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+STORE_VERSION = 1
+METADATA_FILE = "metadata.json"
+EPISODE_INDEX_FILE = "index.json"
+
+# Target size of one uncompressed chunk; the number of steps per chunk is derived per column from it
+CHUNK_BYTES = 1 << 20
+
+
+class Codec:
+    def __init__(self, name, compress, decompress):
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+
+
+CODECS = {
+    "none": Codec("none", bytes, bytes),
+    "zlib": Codec("zlib", lambda data: zlib.compress(data, 1), zlib.decompress),
+}
+if ZSTD_AVAILABLE:
+    CODECS["zstd"] = Codec(
+        "zstd",
+        lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    )
+if LZ4_AVAILABLE:
+    CODECS["lz4"] = Codec("lz4", lz4.frame.compress, lz4.frame.decompress)
+
+DEFAULT_CODEC = "zstd" if ZSTD_AVAILABLE else "lz4" if LZ4_AVAILABLE else "zlib"
+
+
+def register_codec(name, compress, decompress):
+    CODECS[name] = Codec(name, compress, decompress)
+
+
+def get_codec(name):
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec '{name}', available codecs: {list(CODECS)}")
+    return CODECS[name]
+
+
+_executor = None
+
+
+def _get_executor():
+    # zlib, zstd and lz4 all release the GIL, so one thread per core runs chunks truly in parallel
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="EpisodeStore")
+    return _executor
+
+
+def is_store(path):
+    return Path(path).is_dir() and (Path(path) / METADATA_FILE).exists()
+
+
+def write_json(filepath, data):
+    # Write-then-rename so readers never see a half written index
+    tmp_path = filepath.with_name(filepath.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, filepath)
+
+
+def _chunk_path(column_dir, chunk_idx):
+    return column_dir / f"{chunk_idx:05d}.bin"
+
+
+class EpisodeStore:
+    def __init__(self, path, codec=None, chunk_bytes=CHUNK_BYTES):
+        self.path = Path(path)
+        self.codec = get_codec(codec or DEFAULT_CODEC)
+        self.chunk_bytes = chunk_bytes
+
+    @property
+    def filepath(self):
+        return self.path
+
+    def write_episode(self, index, episode):
+        episode_dir = self.path / f"episode_{index}"
+        episode_dir.mkdir(parents=True, exist_ok=True)
+
+        columns = {}
+        videos = {}
+        for key, value in episode.items():
+            if isinstance(value, VideoStreamWriter):
+                frame_timestamps = value.close()
+                videos[key] = value.filepath.relative_to(self.path).as_posix()
+                name = f"{key}_frame_timestamps"
+                columns[name] = self._write_column(episode_dir, name, frame_timestamps)
+            else:
+                columns[key] = self._write_column(episode_dir, key, np.asarray(value))
+
+        # The index is written last, an episode without one was interrupted and is ignored
+        num_steps = columns["observations"]["length"] if "observations" in columns else 0
+        write_json(episode_dir / EPISODE_INDEX_FILE, {"num_steps": num_steps, "columns": columns, "videos": videos})
+
+    def _write_column(self, episode_dir, name, array):
+        array = np.ascontiguousarray(array)
+        row_bytes = max(1, array[:1].nbytes)
+        chunk_size = max(1, self.chunk_bytes // row_bytes)
+        chunks = [array[start:start + chunk_size] for start in range(0, len(array), chunk_size)]
+
+        column_dir = episode_dir / name
+        column_dir.mkdir(exist_ok=True)
+        compressed = _get_executor().map(lambda chunk: self.codec.compress(chunk.tobytes()), chunks)
+        for chunk_idx, payload in enumerate(compressed):
+            with open(_chunk_path(column_dir, chunk_idx), "wb") as f:
+                f.write(payload)
+
+        return {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape[1:]),
+            "length": len(array),
+            "codec": self.codec.name,
+            "chunk_size": chunk_size,
+            "num_chunks": len(chunks),
+        }
+
+    def finalize(self, metadata):
+        metadata = dict(metadata, format="episode_store", version=STORE_VERSION)
+        self.path.mkdir(parents=True, exist_ok=True)
+        write_json(self.path / METADATA_FILE, metadata)
+        return self.path
+
+
+def read_metadata(path):
+    with open(Path(path) / METADATA_FILE) as f:
+        return json.load(f)
+
+
+def read_episode_index(path, episode_idx):
+    with open(Path(path) / f"episode_{episode_idx}" / EPISODE_INDEX_FILE) as f:
+        return json.load(f)
+
+
+def read_column(path, episode_idx, name, column=None):
+    column_dir = Path(path) / f"episode_{episode_idx}" / name
+    if column is None:
+        column = read_episode_index(path, episode_idx)["columns"][name]
+
+    codec = get_codec(column["codec"])
+    dtype = np.dtype(column["dtype"])
+    out = np.empty((column["length"],) + tuple(column["shape"]), dtype=dtype)
+
+    def read_chunk(chunk_idx):
+        with open(_chunk_path(column_dir, chunk_idx), "rb") as f:
+            rows = np.frombuffer(codec.decompress(f.read()), dtype=dtype).reshape((-1,) + out.shape[1:])
+        start = chunk_idx * column["chunk_size"]
+        out[start:start + len(rows)] = rows
+
+    list(_get_executor().map(read_chunk, range(column["num_chunks"])))
+    return out
+
+
+class ChunkedColumn:
+    # Array-like column read on demand in fixed-size row chunks; subclasses set `shape`, `dtype`, `chunk_size`
+    # and implement `_read_chunk`. With `parallel_reads` set, chunks missing from a read are decoded together on
+    # the store's thread pool.
+    parallel_reads = False
+
+    def __init__(self, shape, dtype, chunk_size, cache_size=4):
+        self.shape = shape
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+
+        # Decoded chunks are kept in a small LRU so sequential access decompresses every chunk once
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def num_chunks(self):
+        return -(-len(self) // self.chunk_size)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        rows = self[:]
+        return rows if dtype is None else rows.astype(dtype)
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            first, rest = index[0], index[1:]
+            rows = self[first]
+            if isinstance(first, slice) or np.ndim(first) > 0:
+                rest = (slice(None),) + rest
+            return rows[rest]
+
+        if isinstance(index, slice):
+            return self._take(np.arange(*index.indices(len(self))))
+        if np.ndim(index) > 0:
+            indices = np.asarray(index)
+            return self._take(np.where(indices < 0, indices + len(self), indices))
+
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Index {index} out of range for column of length {len(self)}")
+        return self._chunk(index // self.chunk_size)[index % self.chunk_size]
+
+    def _take(self, indices):
+        out = np.empty((len(indices),) + self.shape[1:], dtype=self.dtype)
+        if len(indices) == 0:
+            return out
+        if indices.min() < 0 or indices.max() >= len(self):
+            raise IndexError(f"Index out of range for column of length {len(self)}")
+
+        chunk_ids = indices // self.chunk_size
+        for chunk_idx, chunk in self._chunks(np.unique(chunk_ids).tolist()).items():
+            mask = chunk_ids == chunk_idx
+            out[mask] = chunk[indices[mask] % self.chunk_size]
+        return out
+
+    def _chunk_shape(self, chunk_idx):
+        return (min(self.chunk_size, len(self) - chunk_idx * self.chunk_size),) + self.shape[1:]
+
+    def _chunk(self, chunk_idx):
+        with self._lock:
+            if chunk_idx in self._cache:
+                self._cache.move_to_end(chunk_idx)
+                return self._cache[chunk_idx]
+
+        chunk = self._read_chunk(chunk_idx)
+
+        with self._lock:
+            self._cache[chunk_idx] = chunk
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return chunk
+
+    def _chunks(self, chunk_ids):
+        with self._lock:
+            chunks = {chunk_idx: self._cache[chunk_idx] for chunk_idx in chunk_ids if chunk_idx in self._cache}
+            for chunk_idx in chunks:
+                self._cache.move_to_end(chunk_idx)
+
+        # Chunks missing from the cache are decompressed in parallel, like `read_column` does
+        missing = [chunk_idx for chunk_idx in chunk_ids if chunk_idx not in chunks]
+        if self.parallel_reads and len(missing) > 1:
+            chunks.update(zip(missing, _get_executor().map(self._read_chunk, missing)))
+        else:
+            chunks.update((chunk_idx, self._read_chunk(chunk_idx)) for chunk_idx in missing)
+
+        with self._lock:
+            for chunk_idx in missing:
+                self._cache[chunk_idx] = chunks[chunk_idx]
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return chunks
+
+    def _read_chunk(self, chunk_idx):
+        raise NotImplementedError
+
+
+class StoreColumn(ChunkedColumn):
+    # Every chunk is its own file
+    parallel_reads = True
+
+    def __init__(self, column_dir, column, cache_size=4):
+        shape = (column["length"],) + tuple(column["shape"])
+        super().__init__(shape, np.dtype(column["dtype"]), column["chunk_size"], cache_size)
+        self.column_dir = Path(column_dir)
+        self.codec = get_codec(column["codec"])
+
+    def _read_chunk(self, chunk_idx):
+        path = _chunk_path(self.column_dir, chunk_idx)
+        if self.codec.name == "none":
+            # Uncompressed chunks are memory-mapped, pages are only read when touched
+            return np.memmap(path, dtype=self.dtype, mode="r", shape=self._chunk_shape(chunk_idx))
+        with open(path, "rb") as f:
+            return np.frombuffer(self.codec.decompress(f.read()), dtype=self.dtype).reshape(self._chunk_shape(chunk_idx))
+
+
+def open_column(path, episode_idx, name, column=None):
+    if column is None:
+        column = read_episode_index(path, episode_idx)["columns"][name]
+    return StoreColumn(Path(path) / f"episode_{episode_idx}" / name, column)
@@ -0,0 +1,115 @@
+import queue
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Container extension for each supported fourcc
+VIDEO_CONTAINERS = {
+    "mp4v": ".mp4",
+    "avc1": ".mp4",
+    "MJPG": ".avi",
+    "XVID": ".avi",
+}
+
+
+class VideoStreamWriter:
+    def __init__(self, filepath, codec="mp4v", fps=50, max_pending=64):
+        if codec not in VIDEO_CONTAINERS:
+            raise ValueError(f"Unsupported video codec '{codec}', must be one of {list(VIDEO_CONTAINERS)}")
+
+        self.filepath = Path(filepath).with_suffix(VIDEO_CONTAINERS[codec])
+        self.codec = codec
+        self.fps = fps
+        self.frame_timestamps = []
+        self._writer = None
+        self._error = None
+
+        # Frames are encoded on their own thread so the control loop only pays for a queue put
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name=f"VideoStreamWriter-{self.filepath.stem}", daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return len(self.frame_timestamps)
+
+    def write(self, frame, timestamp):
+        if self._error is not None:
+            raise RuntimeError(f"Failed to encode {self.filepath}: {self._error}")
+        self.frame_timestamps.append(timestamp)
+        self._queue.put(frame)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise RuntimeError(f"Failed to encode {self.filepath}: {self._error}")
+        return np.asarray(self.frame_timestamps, dtype=np.float64)
+
+    def _run(self):
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is None:
+                    break
+                if self._writer is None:
+                    self._open(frame.shape)
+                self._writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+        except Exception as e:
+            self._error = e
+            # Keep draining so producers never block on a dead encoder
+            while self._queue.get() is not None:
+                pass
+        finally:
+            if self._writer is not None:
+                self._writer.release()
+
+    def _open(self, shape):
+        height, width = shape[:2]
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = cv2.VideoWriter(str(self.filepath), cv2.VideoWriter_fourcc(*self.codec), self.fps, (width, height))
+        if not self._writer.isOpened():
+            raise RuntimeError(f"OpenCV could not open a '{self.codec}' encoder")
+
+
+class VideoStreamReader:
+    def __init__(self, filepath, frame_timestamps):
+        self.filepath = Path(filepath)
+        self.frame_timestamps = np.asarray(frame_timestamps)
+        self._capture = None
+        self._next_frame = 0
+
+    def __len__(self):
+        return len(self.frame_timestamps)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return np.stack([self[i] for i in range(*index.indices(len(self)))])
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Frame {index} out of range for {self.filepath.name} ({len(self)} frames)")
+
+        if self._capture is None:
+            self._capture = cv2.VideoCapture(str(self.filepath))
+        # Sequential reads decode straight through; anything else costs a seek
+        if index != self._next_frame:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+
+        ok, frame = self._capture.read()
+        if not ok:
+            raise OSError(f"Could not decode frame {index} of {self.filepath}")
+        self._next_frame = index + 1
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def frame_at(self, timestamp):
+        index = int(np.searchsorted(self.frame_timestamps, timestamp, side="right")) - 1
+        return self[max(index, 0)]
+
+    def close(self):
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
@@ -0,0 +1,86 @@
+import queue
+import threading
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from .video import VideoStreamWriter
+
+
+class NpzSink:
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+
+    def write_episode(self, index, episode):
+        # Append members to the archive so every finished episode is on disk right away
+        with zipfile.ZipFile(self.filepath, mode="a", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+            for key, value in episode.items():
+                if isinstance(value, VideoStreamWriter):
+                    # Only the path and the frame-timestamp index go in the archive, frames stay in the video
+                    frame_timestamps = value.close()
+                    video_path = value.filepath.relative_to(self.filepath.parent)
+                    self._write_array(zf, f"episode_{index}_{key}_video", np.asarray(video_path.as_posix()))
+                    self._write_array(zf, f"episode_{index}_{key}_frame_timestamps", frame_timestamps)
+                else:
+                    self._write_array(zf, f"episode_{index}_{key}", value)
+
+    def finalize(self, metadata):
+        with zipfile.ZipFile(self.filepath, mode="a", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+            for key, value in metadata.items():
+                self._write_array(zf, key, np.asarray(value))
+        return self.filepath
+
+    @staticmethod
+    def _write_array(zf, name, array):
+        with zf.open(f"{name}.npy", mode="w", force_zip64=True) as f:
+            np.lib.format.write_array(f, np.asanyarray(array), allow_pickle=False)
+
+
+class EpisodeWriter:
+    def __init__(self, sink, max_pending=1):
+        self.sink = sink
+        # submit() never blocks the control loop: when the disk falls behind, finished episodes queue up in memory
+        # and a warning is printed once more than `max_pending` wait on top of the one being written
+        self.max_pending = max_pending
+        self._queue = queue.Queue()
+        self._warned = False
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="EpisodeWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, index, episode):
+        self._raise_error()
+        self._queue.put_nowait((index, episode))
+        if self._queue.qsize() > self.max_pending and not self._warned:
+            self._warned = True
+            print(f"Warning: the episode writer is {self._queue.qsize()} episodes behind, they are kept in memory "
+                  f"until written")
+
+    def flush(self):
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                index, episode = item
+                self.sink.write_episode(index, episode)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError(f"Failed to write episode: {error}") from error
@@ -1,5 +1,5 @@
-from .loader import list_recordings, load_recording
+from .loader import list_recordings, load_camera_stream, load_recording, read_steps
 from .player import ReplayController
 
-__all__ = ["list_recordings", "load_recording", "ReplayController"]
+__all__ = ["list_recordings", "load_recording", "load_camera_stream", "read_steps", "ReplayController"]
 
@@ -1,59 +1,146 @@
 import numpy as np
+import threading
+import zipfile
+from collections.abc import Mapping
 from pathlib import Path
 from datetime import datetime
 
+from ..recording import store
+from ..recording.catalog import load_catalog, recording_signature, save_catalog
+from ..recording.video import VideoStreamReader
 
-def list_recordings(data_dir="collected_data"):
+EPISODE_KEYS = ["observations", "actions", "rewards", "timestamps"]
+CAMERA_KEYS = ["images_front", "images_top"]
+SNAPSHOT_KEYS = ["snapshots", "snapshot_steps"]
+
+
+def list_recordings(data_dir="collected_data", env_name=None, control_method=None):
     data_path = Path(data_dir)
     
     if not data_path.exists():
         return []
     
-    recordings = []
-    for file in sorted(data_path.glob("*.npz"), reverse=True):
+    # The catalog caches each recording's summary keyed by its mtime/size, only new or changed files are scanned
+    catalog = load_catalog(data_path)
+    entries = {}
+    
+    candidates = list(data_path.glob("*.npz")) + [path for path in data_path.iterdir() if store.is_store(path)]
+    for file in candidates:
         try:
-            data = np.load(file, allow_pickle=True)
-            
-            env_name = str(data["env_name"])
-            control_method = str(data["control_method"])
-            num_episodes = int(data["num_episodes"])
-            timestamp = str(data["timestamp"])
-            
-            total_steps = 0
-            for i in range(num_episodes):
-                obs = data[f"episode_{i}_observations"]
-                total_steps += len(obs)
-            
-            recordings.append({
-                "filename": file.name,
-                "filepath": str(file),
-                "env_name": env_name,
-                "control_method": control_method,
-                "num_episodes": num_episodes,
-                "total_steps": total_steps,
-                "timestamp": timestamp,
-                "date": datetime.strptime(timestamp, "%Y%m%d_%H%M%S")
-            })
+            signature = recording_signature(file)
+            entry = catalog.get(file.name)
+            if entry is None or entry["signature"] != signature:
+                info = _store_info(file) if store.is_store(file) else _npz_info(file)
+                entry = dict(info, signature=signature)
+            entries[file.name] = entry
         except Exception:
             continue
     
+    if entries != catalog:
+        try:
+            save_catalog(data_path, entries)
+        except OSError:
+            pass
+    
+    recordings = []
+    for filename in sorted(entries, reverse=True):
+        entry = entries[filename]
+        if env_name is not None and entry["env_name"] != env_name:
+            continue
+        if control_method is not None and entry["control_method"] != control_method:
+            continue
+        
+        recordings.append({
+            "filename": filename,
+            "filepath": str(data_path / filename),
+            "env_name": entry["env_name"],
+            "control_method": entry["control_method"],
+            "num_episodes": entry["num_episodes"],
+            "total_steps": entry["total_steps"],
+            "timestamp": entry["timestamp"],
+            "date": datetime.strptime(entry["timestamp"], "%Y%m%d_%H%M%S")
+        })
+    
     return recordings
 
 
+def _npz_info(filepath):
+    # Step counts come from the .npy headers inside the archive, no array payload is read
+    with zipfile.ZipFile(filepath) as zf:
+        def read_value(key):
+            with zf.open(f"{key}.npy") as f:
+                return np.lib.format.read_array(f, allow_pickle=False)
+        
+        def read_length(key):
+            with zf.open(f"{key}.npy") as f:
+                if np.lib.format.read_magic(f) == (1, 0):
+                    shape, _, _ = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, _, _ = np.lib.format.read_array_header_2_0(f)
+            return shape[0]
+        
+        num_episodes = int(read_value("num_episodes"))
+        total_steps = sum(read_length(f"episode_{i}_observations") for i in range(num_episodes))
+        
+        return {
+            "env_name": str(read_value("env_name")),
+            "control_method": str(read_value("control_method")),
+            "num_episodes": num_episodes,
+            "total_steps": int(total_steps),
+            "timestamp": str(read_value("timestamp")),
+        }
+
+
+def _store_info(path):
+    # Step counts live in the per-episode index, no chunk is decompressed
+    metadata = store.read_metadata(path)
+    num_episodes = int(metadata["num_episodes"])
+    total_steps = sum(store.read_episode_index(path, i)["num_steps"] for i in range(num_episodes))
+    
+    return {
+        "env_name": metadata["env_name"],
+        "control_method": metadata["control_method"],
+        "num_episodes": num_episodes,
+        "total_steps": total_steps,
+        "timestamp": metadata["timestamp"],
+    }
+
+
+class LazyEpisode(Mapping):
+    def __init__(self, list_keys, open_column):
+        self._list_keys = list_keys
+        self._keys = None
+        self._open_column = open_column
+        self._columns = {}
+    
+    def _resolve_keys(self):
+        if self._keys is None:
+            self._keys = list(self._list_keys())
+        return self._keys
+    
+    def __getitem__(self, key):
+        if key not in self._resolve_keys():
+            raise KeyError(key)
+        if key not in self._columns:
+            self._columns[key] = self._open_column(key)
+        return self._columns[key]
+    
+    def __iter__(self):
+        return iter(self._resolve_keys())
+    
+    def __len__(self):
+        return len(self._resolve_keys())
+
+
 def load_recording(filepath):
+    # Episodes are opened lazily: nothing is read until a column is accessed, and then only the chunks it needs
+    if store.is_store(filepath):
+        return _load_store(Path(filepath))
+    
     data = np.load(filepath, allow_pickle=True)
     
     num_episodes = int(data["num_episodes"])
-    episodes = []
-    
-    for i in range(num_episodes):
-        episode = {
-            "observations": data[f"episode_{i}_observations"],
-            "actions": data[f"episode_{i}_actions"],
-            "rewards": data[f"episode_{i}_rewards"],
-            "timestamps": data[f"episode_{i}_timestamps"]
-        }
-        episodes.append(episode)
+    episodes = [_npz_episode(data, Path(filepath), i) for i in range(num_episodes)]
     
     return {
         "env_name": str(data["env_name"]),
@@ -62,3 +149,147 @@ def load_recording(filepath):
         "episodes": episodes
     }
 
+
+def _npz_episode(data, filepath, episode_idx):
+    def list_keys():
+        cameras = [camera for camera in CAMERA_KEYS if _npz_has_camera(data, episode_idx, camera)]
+        snapshots = [key for key in SNAPSHOT_KEYS if f"episode_{episode_idx}_{key}" in data]
+        return EPISODE_KEYS + cameras + snapshots
+    
+    def open_column(key):
+        if key in CAMERA_KEYS:
+            return _npz_camera_stream(data, filepath, episode_idx, key)
+        return NpzColumn.open(data, f"episode_{episode_idx}_{key}")
+    
+    return LazyEpisode(list_keys, open_column)
+
+
+class NpzColumn(store.ChunkedColumn):
+    def __init__(self, zf, member, cache_size=4):
+        self.zf = zf
+        self.member = member
+        with zf.open(member) as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            self.data_offset = f.tell()
+        self.fortran_order = fortran_order
+        
+        row_bytes = max(1, dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64)))
+        super().__init__(tuple(shape), dtype, max(1, store.CHUNK_BYTES // row_bytes), cache_size)
+        self.row_bytes = row_bytes
+        
+        # Deflated members can't be seeked into, so one stream is kept open and reads move forward through it
+        self._stream = None
+        self._stream_lock = threading.Lock()
+    
+    @classmethod
+    def open(cls, data, key):
+        column = cls(data.zip, f"{key}.npy")
+        if column.fortran_order or column.dtype.hasobject or column.ndim == 0:
+            return data[key]
+        return column
+    
+    def _read_chunk(self, chunk_idx):
+        offset = self.data_offset + chunk_idx * self.chunk_size * self.row_bytes
+        shape = self._chunk_shape(chunk_idx)
+        with self._stream_lock:
+            if self._stream is None or self._stream.tell() > offset:
+                if self._stream is not None:
+                    self._stream.close()
+                self._stream = self.zf.open(self.member)
+            self._stream.seek(offset)
+            payload = self._stream.read(shape[0] * self.row_bytes)
+        return np.frombuffer(payload, dtype=self.dtype).reshape(shape)
+
+
+def read_steps(recording, episode_idx, start=0, stop=None, keys=None):
+    # Rows [start, stop) of the requested per-step columns; only the chunks (or video frames) covering them are read
+    if not isinstance(recording, Mapping):
+        recording = load_recording(recording)
+    episode = recording["episodes"][episode_idx]
+    
+    step_keys = [key for key in episode if key not in SNAPSHOT_KEYS]
+    if keys is None:
+        keys = step_keys
+    for key in keys:
+        if key not in step_keys:
+            raise KeyError(f"'{key}' is not a per-step column of episode {episode_idx}, available: {step_keys}")
+    
+    steps = slice(start, stop)
+    return {key: np.asarray(episode[key][steps]) for key in keys}
+
+
+def _load_store(path):
+    metadata = store.read_metadata(path)
+    
+    num_episodes = int(metadata["num_episodes"])
+    episodes = [_store_episode(path, i) for i in range(num_episodes)]
+    
+    return {
+        "env_name": metadata["env_name"],
+        "control_method": metadata["control_method"],
+        "num_episodes": num_episodes,
+        "episodes": episodes
+    }
+
+
+def _store_episode(path, episode_idx):
+    index = None
+    
+    def read_index():
+        nonlocal index
+        if index is None:
+            index = store.read_episode_index(path, episode_idx)
+        return index
+    
+    def list_keys():
+        stored = set(read_index()["videos"]) | set(read_index()["columns"])
+        cameras = [camera for camera in CAMERA_KEYS if camera in stored]
+        snapshots = [key for key in SNAPSHOT_KEYS if key in stored]
+        return EPISODE_KEYS + cameras + snapshots
+    
+    def open_column(key):
+        if key in CAMERA_KEYS:
+            return _store_camera_stream(path, episode_idx, read_index(), key)
+        return store.open_column(path, episode_idx, key, read_index()["columns"][key])
+    
+    return LazyEpisode(list_keys, open_column)
+
+
+def load_camera_stream(filepath, episode_idx, camera):
+    filepath = Path(filepath)
+    
+    if store.is_store(filepath):
+        index = store.read_episode_index(filepath, episode_idx)
+        return _store_camera_stream(filepath, episode_idx, index, camera)
+    
+    data = np.load(filepath, allow_pickle=True)
+    if not _npz_has_camera(data, episode_idx, camera):
+        return None
+    return _npz_camera_stream(data, filepath, episode_idx, camera)
+
+
+def _store_camera_stream(path, episode_idx, index, camera):
+    # Video-encoded streams are decoded on demand through their frame-timestamp index
+    if camera in index["videos"]:
+        frame_timestamps = store.read_column(path, episode_idx, f"{camera}_frame_timestamps")
+        return VideoStreamReader(path / index["videos"][camera], frame_timestamps)
+    if camera in index["columns"]:
+        return store.open_column(path, episode_idx, camera, index["columns"][camera])
+    return None
+
+
+def _npz_has_camera(data, episode_idx, camera):
+    key = f"episode_{episode_idx}_{camera}"
+    return key in data or f"{key}_video" in data
+
+
+def _npz_camera_stream(data, filepath, episode_idx, camera):
+    key = f"episode_{episode_idx}_{camera}"
+    if f"{key}_video" in data:
+        video_path = filepath.parent / str(data[f"{key}_video"])
+        return VideoStreamReader(video_path, data[f"{key}_frame_timestamps"])
+    return NpzColumn.open(data, key)
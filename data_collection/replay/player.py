@@ -1,6 +1,10 @@
-import time
+import math
 import numpy as np
 from ..controllers.base import BaseController
+from ..recording.snapshots import restore_state
+from .loader import CAMERA_KEYS
+from .prefetch import FramePrefetcher
+from .scheduler import PlaybackScheduler
 
 
 class ReplayController(BaseController):
@@ -10,17 +14,90 @@ class ReplayController(BaseController):
         self.current_episode_idx = 0
         self.current_step_idx = 0
         self.paused = False
-        self.playback_speed = 1.0
         self.current_observation = None
+        self.prefetcher = None
+        self._restore_start = False
+        
+        # Playback is paced against absolute deadlines; with skip_frames, late steps are simulated without being
+        # viewed to catch up when behind
+        self.scheduler = PlaybackScheduler()
+        self.skip_frames = False
+        self.skipped_frames = 0
+        self.timestamps = None
         
         self.start_episode()
     
+    @property
+    def playback_speed(self):
+        return self.scheduler.speed
+    
+    @playback_speed.setter
+    def playback_speed(self, speed):
+        # None or math.inf plays as fast as possible
+        self.scheduler.speed = speed
+    
     def start_episode(self):
         if self.current_episode_idx >= len(self.episodes):
             self.current_episode_idx = 0
         
         self.current_step_idx = 0
         self.episode = 1
+        self._begin_episode()
+    
+    def _begin_episode(self):
+        self.scheduler.reset()
+        self.timestamps = None
+        self._stop_prefetch()
+        self._restore_start = False
+        if self.current_episode_idx >= len(self.episodes):
+            return
+        
+        episode = self.episodes[self.current_episode_idx]
+        self.timestamps = np.asarray(episode["timestamps"], dtype=np.float64)
+        
+        # The episode's first action restores its recorded start state, so playback starts where the recording
+        # did; it runs after the env.reset() the loop does once should_reset() returns True
+        if self.current_step_idx == 0 and "snapshots" in episode:
+            self._restore_start = episode["snapshot_steps"][0] == 0
+        
+        # Recorded camera frames are decoded ahead of the playhead on a background thread
+        if any(camera in episode for camera in CAMERA_KEYS):
+            self.prefetcher = FramePrefetcher(episode, CAMERA_KEYS, start_step=self.current_step_idx)
+    
+    def can_seek(self):
+        return self.current_episode_idx < len(self.episodes) and "snapshots" in self.episodes[self.current_episode_idx]
+    
+    def seek(self, step):
+        # Restore the nearest snapshot at or before `step` and simulate forward only the remaining steps
+        if not self.can_seek():
+            raise ValueError("This recording has no simulator snapshots to seek with")
+        
+        episode = self.episodes[self.current_episode_idx]
+        step = min(max(int(step), 0), len(episode["actions"]))
+        
+        snapshot_steps = np.asarray(episode["snapshot_steps"])
+        snapshot_idx = int(np.searchsorted(snapshot_steps, step, side="right")) - 1
+        if snapshot_idx < 0:
+            raise ValueError(f"No snapshot at or before step {step}")
+        
+        env = self.env.unwrapped
+        restore_state(env, episode["snapshots"][snapshot_idx])
+        # Physics only: no observation or render is needed for the intermediate steps,
+        # and only the actions between the snapshot and `step` are read
+        for action in episode["actions"][int(snapshot_steps[snapshot_idx]):step]:
+            env.apply_action(action)
+        
+        # Playback restarts at `step`: pacing re-anchors and the frame prefetcher restarts from there
+        self.current_step_idx = step
+        self._begin_episode()
+        self._restore_start = False
+        
+        return env.get_observation()
+    
+    def _stop_prefetch(self):
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+            self.prefetcher = None
     
     def get_action(self, observation):
         if self.current_episode_idx >= len(self.episodes):
@@ -32,15 +109,26 @@ class ReplayController(BaseController):
         if self.current_step_idx >= len(episode["actions"]):
             return episode["actions"][-1]
         
+        if self._restore_start:
+            self._restore_start = False
+            restore_state(self.env.unwrapped, episode["snapshots"][0])
+        
         action = episode["actions"][self.current_step_idx]
         self.reward = float(episode["rewards"][self.current_step_idx])
         
-        if "images_front" in episode and self.current_step_idx < len(episode["images_front"]):
-            observation["image_front"] = episode["images_front"][self.current_step_idx]
-        if "images_top" in episode and self.current_step_idx < len(episode["images_top"]):
-            observation["image_top"] = episode["images_top"][self.current_step_idx]
+        # The viewer shows the recorded frames when the prefetcher has them. Otherwise it shows the observation of
+        # the step this action leads to: lazily rendered images of `observation` expire once the env steps.
+        self.current_observation = None
+        frames = self.prefetcher.get(self.current_step_idx) if self.prefetcher is not None else None
+        if frames is not None:
+            recorded = {}
+            if "images_front" in frames:
+                recorded["image_front"] = frames["images_front"]
+            if "images_top" in frames:
+                recorded["image_top"] = frames["images_top"]
+            observation.update(recorded)
+            self.current_observation = recorded or None
         
-        self.current_observation = observation
         self.current_step_idx += 1
         
         return action
@@ -55,6 +143,7 @@ class ReplayController(BaseController):
             self.current_episode_idx += 1
             self.current_step_idx = 0
             self.episode += 1
+            self._begin_episode()
             return True
         
         return False
@@ -66,22 +155,47 @@ class ReplayController(BaseController):
         total_episodes = len(self.episodes)
         progress = f"{self.current_episode_idx + 1}/{total_episodes}"
         
+        target = self.target_rate()
+        target_str = "max" if math.isinf(target) else f"{target:.0f}"
+        
         return (f"[cyan]Episode:[/cyan] {progress}  "
                 f"[green]Reward:[/green] {self.reward:+.3f}  "
-                f"[yellow]Step:[/yellow] {self.current_step_idx}")
+                f"[yellow]Step:[/yellow] {self.current_step_idx}  "
+                f"[magenta]Rate:[/magenta] {self.scheduler.achieved_rate():.0f}/{target_str} Hz")
+    
+    def target_rate(self):
+        if self.scheduler.unbounded:
+            return math.inf
+        if self.timestamps is None or len(self.timestamps) < 2 or self.timestamps[-1] == self.timestamps[0]:
+            return 0.0
+        recorded_rate = (len(self.timestamps) - 1) / (self.timestamps[-1] - self.timestamps[0])
+        return recorded_rate * self.playback_speed
     
     def tick(self):
-        if self.current_episode_idx < len(self.episodes):
+        if self.timestamps is None:
+            return
+        
+        step = self.current_step_idx
+        if step == 0 or step >= len(self.timestamps):
+            return
+        
+        # Anchor the clock on the first step played so the whole episode is timed from one origin
+        if not self.scheduler.started:
+            self.scheduler.start(self.timestamps[step - 1])
+        
+        lateness = self.scheduler.wait_until(self.timestamps[step])
+        if lateness > 0 and self.skip_frames:
+            # Jump to the last step whose deadline has already passed. Late steps still get their recorded action,
+            # so physics follows the recording; only their viewing is skipped (and their rendering, with lazy images)
+            target = int(np.searchsorted(self.timestamps, self.scheduler.media_now(), side="right")) - 1
+            target = min(max(target, step), len(self.timestamps) - 1)
             episode = self.episodes[self.current_episode_idx]
-            
-            if self.current_step_idx > 0 and self.current_step_idx < len(episode["timestamps"]):
-                prev_time = episode["timestamps"][self.current_step_idx - 1]
-                curr_time = episode["timestamps"][self.current_step_idx]
-                dt = (curr_time - prev_time) / self.playback_speed
-                time.sleep(max(0, dt))
-            else:
-                time.sleep(0.02)
+            for late_step in range(step, target):
+                self.env.step(episode["actions"][late_step])
+                self.reward = float(episode["rewards"][late_step])
+            self.skipped_frames += target - step
+            self.current_step_idx = target
     
     def cleanup(self):
-        pass
+        self._stop_prefetch()
 
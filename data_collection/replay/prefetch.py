@@ -0,0 +1,51 @@
+import queue
+import threading
+
+
+class FramePrefetcher:
+    def __init__(self, episode, cameras, start_step=0, depth=32):
+        self.cameras = [camera for camera in cameras if camera in episode]
+        self.streams = {camera: episode[camera] for camera in self.cameras}
+        self.num_frames = min((len(stream) for stream in self.streams.values()), default=0)
+
+        # The bounded queue is the read-ahead window: the decoder stays at most `depth` frames past the playhead
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._pending = None
+        self._thread = threading.Thread(target=self._run, args=(start_step,), name="FramePrefetcher", daemon=True)
+        self._thread.start()
+
+    def get(self, step):
+        # Never blocks: returns None when the decoder has not reached `step` yet
+        while True:
+            item = self._pending
+            if item is None:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    return None
+            self._pending = None
+
+            if item[0] == step:
+                return item[1]
+            if item[0] > step:
+                # Ahead of the playhead, keep it for a later call
+                self._pending = item
+                return None
+            # Frames behind the playhead were skipped, drop them
+
+    def _run(self, start_step):
+        for step in range(start_step, self.num_frames):
+            frames = {camera: stream[step] for camera, stream in self.streams.items()}
+            while not self._stop.is_set():
+                try:
+                    self._queue.put((step, frames), timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if self._stop.is_set():
+                return
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,70 @@
+import math
+import time
+from collections import deque
+
+
+class PlaybackScheduler:
+    def __init__(self, speed=1.0, rate_window=50, clock=time.perf_counter, sleep=time.sleep):
+        self._speed = speed
+        # Injectable so pacing can be checked against a simulated clock
+        self._clock = clock
+        self._sleep = sleep
+        self._anchor_wall = None
+        self._anchor_media = None
+        self._media_time = None
+        self._ticks = deque(maxlen=rate_window)
+
+    @property
+    def speed(self):
+        return self._speed
+
+    @speed.setter
+    def speed(self, speed):
+        # Re-anchor at the current position so a speed change never jumps the playhead
+        if self._media_time is not None:
+            self.start(self.media_now())
+        self._speed = speed
+
+    @property
+    def unbounded(self):
+        return self._speed is None or math.isinf(self._speed)
+
+    def start(self, media_time):
+        self._anchor_wall = self._clock()
+        self._anchor_media = media_time
+        self._media_time = media_time
+
+    def reset(self):
+        self._anchor_wall = None
+        self._anchor_media = None
+        self._media_time = None
+
+    @property
+    def started(self):
+        return self._anchor_wall is not None
+
+    def media_now(self):
+        if self.unbounded:
+            return self._media_time
+        return self._anchor_media + (self._clock() - self._anchor_wall) * self._speed
+
+    def wait_until(self, media_time):
+        # Returns how far behind the deadline of `media_time` we already are, in media seconds
+        self._media_time = media_time
+        lateness = 0.0
+        if not self.unbounded:
+            # Deadlines are absolute, so time spent stepping and rendering is absorbed instead of accumulating
+            deadline = self._anchor_wall + (media_time - self._anchor_media) / self._speed
+            remaining = deadline - self._clock()
+            if remaining > 0:
+                self._sleep(remaining)
+            else:
+                lateness = -remaining * self._speed
+
+        self._ticks.append(self._clock())
+        return lateness
+
+    def achieved_rate(self):
+        if len(self._ticks) < 2 or self._ticks[-1] == self._ticks[0]:
+            return 0.0
+        return (len(self._ticks) - 1) / (self._ticks[-1] - self._ticks[0])
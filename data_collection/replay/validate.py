@@ -0,0 +1,149 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import gymnasium as gym
+import mujoco
+import numpy as np
+from rich import box
+from rich.console import Console
+from rich.table import Table
+
+import gym_lowcostrobot  # noqa
+
+from ..recording.snapshots import restore_state
+from .loader import list_recordings, load_recording
+
+console = Console()
+
+# One headless env per task and worker process, reused across every episode it validates
+_envs = {}
+
+
+def _get_env(env_name):
+    if env_name not in _envs:
+        env = gym.make(env_name, render_mode=None, observation_mode="state", action_mode="joint")
+        # Skip the wrapper stack (time limit, checkers), the validator steps the raw env
+        _envs[env_name] = env.unwrapped
+    return _envs[env_name]
+
+
+def validate_episode(filepath, episode_idx, tolerance=0.05, seed=0):
+    recording = load_recording(filepath)
+    episode = recording["episodes"][episode_idx]
+    actions = np.asarray(episode["actions"])
+    recorded = np.asarray(episode["observations"])
+
+    # Collection resets without a seed and keeps velocities across episodes, only the recorded start snapshot
+    # reproduces the state an episode was played from. Without one, the result depends on `seed`.
+    env = _get_env(recording["env_name"])
+    mujoco.mj_resetData(env.model, env.data)
+    env.reset(seed=seed)
+    snapshot_steps = np.asarray(episode["snapshot_steps"]) if "snapshot_steps" in episode else np.zeros(0)
+    from_snapshot = len(snapshot_steps) > 0 and snapshot_steps[0] == 0
+    if from_snapshot:
+        restore_state(env, episode["snapshots"][0])
+
+    replayed = np.empty_like(recorded)
+    for step, action in enumerate(actions):
+        observation, _, _, _, _ = env.step(action)
+        replayed[step] = observation["arm_qpos"]
+
+    error = np.abs(replayed - recorded)
+    step_error = error.max(axis=1) if len(error) else np.zeros(0)
+    diverged = np.flatnonzero(step_error > tolerance)
+
+    return {
+        "filepath": str(filepath),
+        "episode": episode_idx,
+        "num_steps": len(actions),
+        "max_error": float(step_error.max()) if len(step_error) else 0.0,
+        "mean_error": float(error.mean()) if len(error) else 0.0,
+        "final_error": float(step_error[-1]) if len(step_error) else 0.0,
+        "joint_max_error": error.max(axis=0).tolist() if len(error) else [],
+        "diverged_at": int(diverged[0]) if len(diverged) else None,
+        "from_snapshot": bool(from_snapshot),
+    }
+
+
+def validate_recordings(filepaths, tolerance=0.05, workers=None):
+    jobs = []
+    for filepath in filepaths:
+        num_episodes = load_recording(filepath)["num_episodes"]
+        jobs.extend((filepath, i) for i in range(num_episodes))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = {executor.submit(validate_episode, filepath, i, tolerance): (filepath, i) for filepath, i in jobs}
+        for future in as_completed(futures):
+            filepath, i = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({"filepath": str(filepath), "episode": i, "error": str(e)})
+
+    return sorted(results, key=lambda result: (result["filepath"], result["episode"]))
+
+
+def print_report(results, tolerance):
+    table = Table(box=box.SIMPLE_HEAVY, border_style="cyan")
+    table.add_column("Recording", style="cyan")
+    table.add_column("Ep", style="bold yellow", justify="right")
+    table.add_column("Steps", justify="right")
+    table.add_column("Max err", justify="right")
+    table.add_column("Mean err", justify="right")
+    table.add_column("Final err", justify="right")
+    table.add_column("Diverged at", justify="right")
+
+    for result in results:
+        name = os.path.basename(result["filepath"])
+        if "error" in result:
+            table.add_row(name, str(result["episode"]), "-", "-", "-", "-", f"[bold red]{result['error']}[/bold red]")
+            continue
+        diverged = "-" if result["diverged_at"] is None else f"[bold red]{result['diverged_at']}[/bold red]"
+        table.add_row(
+            name,
+            str(result["episode"]),
+            str(result["num_steps"]),
+            f"{result['max_error']:.4f}",
+            f"{result['mean_error']:.4f}",
+            f"{result['final_error']:.4f}",
+            diverged,
+        )
+
+    console.print(table)
+
+    unseeded = [result for result in results if "error" not in result and not result["from_snapshot"]]
+    if unseeded:
+        console.print(
+            f"[yellow]⚠️  {len(unseeded)} episode(s) have no start snapshot and were replayed from a seeded reset, "
+            f"their errors depend on the seed rather than on the recording[/yellow]"
+        )
+
+    failed = [result for result in results if "error" in result or result["diverged_at"] is not None]
+    style = "bold red" if failed else "bold green"
+    console.print(f"[{style}]{len(results) - len(failed)}/{len(results)} episodes within tolerance {tolerance}[/{style}]")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay every recorded episode headlessly and report divergence")
+    parser.add_argument("recordings", nargs="*", help="recordings to check, defaults to every one in --data-dir")
+    parser.add_argument("--data-dir", default="collected_data")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="max joint error (rad) before a step diverges")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to the CPU count")
+    args = parser.parse_args()
+
+    filepaths = args.recordings or [rec["filepath"] for rec in list_recordings(args.data_dir)]
+    if not filepaths:
+        console.print("[yellow]No recordings found[/yellow]")
+        return 0
+
+    results = validate_recordings(filepaths, tolerance=args.tolerance, workers=args.workers)
+    failed = print_report(results, args.tolerance)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
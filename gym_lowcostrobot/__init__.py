@@ -1,44 +1,64 @@
+import functools
 import os
 
 from gymnasium.envs.registration import register
 
+from . import gl_backend
+
+# Pick the offscreen GL backend before anything imports mujoco, which reads MUJOCO_GL only once
+gl_backend.select_backend()
+
 __version__ = "0.0.1"
 
 ASSETS_PATH = os.path.join(os.path.dirname(__file__), "assets", "low_cost_robot_6dof")
 BASE_LINK_NAME = "link_1"
 
+
+def make_batched(env_id, num_envs, **kwargs):
+    # Vector entry point of every task, mujoco is only imported once a batched env is created
+    from .envs.batched_env import BatchedEnv
+
+    return BatchedEnv(env_id, num_envs, **kwargs)
+
+
 register(
     id="LiftCube-v0",
     entry_point="gym_lowcostrobot.envs:LiftCubeEnv",
+    vector_entry_point=functools.partial(make_batched, "LiftCube-v0"),
     max_episode_steps=500,
 )
 
 register(
     id="PickPlaceCube-v0",
     entry_point="gym_lowcostrobot.envs:PickPlaceCubeEnv",
+    vector_entry_point=functools.partial(make_batched, "PickPlaceCube-v0"),
     max_episode_steps=500,
 )
 
 register(
     id="PushCube-v0",
     entry_point="gym_lowcostrobot.envs:PushCubeEnv",
+    vector_entry_point=functools.partial(make_batched, "PushCube-v0"),
     max_episode_steps=500,
 )
 
 register(
     id="ReachCube-v0",
     entry_point="gym_lowcostrobot.envs:ReachCubeEnv",
+    vector_entry_point=functools.partial(make_batched, "ReachCube-v0"),
     max_episode_steps=500,
 )
 
 register(
     id="StackTwoCubes-v0",
     entry_point="gym_lowcostrobot.envs:StackTwoCubesEnv",
+    vector_entry_point=functools.partial(make_batched, "StackTwoCubes-v0"),
     max_episode_steps=500,
 )
 
 register(
     id="PushCubeLoop-v0",
     entry_point="gym_lowcostrobot.envs:PushCubeLoopEnv",
+    vector_entry_point=functools.partial(make_batched, "PushCubeLoop-v0"),
     max_episode_steps=500,
 )
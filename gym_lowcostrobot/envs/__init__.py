@@ -1,3 +1,6 @@
+from .base_env import LowCostRobotEnv
+from .batched_env import BatchedEnv
+from .subprocess_env import SubprocessEnv
 from .lift_cube_env import LiftCubeEnv
 from .pick_place_cube_env import PickPlaceCubeEnv
 from .push_cube_env import PushCubeEnv
@@ -5,4 +8,14 @@ from .reach_cube_env import ReachCubeEnv
 from .stack_two_cubes_env import StackTwoCubesEnv
 from .push_cube_loop_env import PushCubeLoopEnv
 
-__all__ = ["LiftCubeEnv", "PickPlaceCubeEnv", "PushCubeEnv", "ReachCubeEnv", "StackTwoCubesEnv", "PushCubeLoopEnv"]
+__all__ = [
+    "LowCostRobotEnv",
+    "BatchedEnv",
+    "SubprocessEnv",
+    "LiftCubeEnv",
+    "PickPlaceCubeEnv",
+    "PushCubeEnv",
+    "ReachCubeEnv",
+    "StackTwoCubesEnv",
+    "PushCubeLoopEnv",
+]
@@ -0,0 +1,435 @@
+import functools
+import os
+
+import gymnasium as gym
+import mujoco
+import numpy as np
+from gymnasium import Env, spaces
+
+from gym_lowcostrobot import ASSETS_PATH, BASE_LINK_NAME, model_cache, viser_viewer
+from gym_lowcostrobot import reset_pool as reset_pools
+
+from .observation import LazyObservation
+
+# Joint-mode action limits of the arm, in radians
+JOINT_LOW = np.array([-3.14159, -1.5708, -1.48353, -1.91986, -2.96706, -1.74533])
+JOINT_HIGH = np.array([3.14159, 1.22173, 1.74533, 1.91986, 2.96706, 0.0523599])
+
+# Image observation produced by each camera
+CAMERA_OBSERVATIONS = {"camera_front": "image_front", "camera_top": "image_top"}
+
+# Everything mj_step reads: time, qpos, qvel, act, warmstart, ctrl, applied forces, mocap and userdata
+STATE_SPEC = mujoco.mjtState.mjSTATE_INTEGRATION
+
+
+class LowCostRobotEnv(Env):
+    """
+    Common base of the low cost robot tasks.
+
+    It loads the scene, builds the action and observation spaces and resolves every body, camera and dof id once at
+    construction, so `step` does no name lookups and reuses its scratch buffers. Tasks add their own observation
+    entries with `get_task_observation`, place their objects in `reset_task` and score a step in `compute_reward`.
+
+    Camera options, accepted by every task:
+
+    - `camera_render_period (int or dict)`: number of control steps a rendered camera frame is held for, either one
+        value for all cameras or a dict such as `{"camera_front": 4, "camera_top": 10}`, default is 1 (every step).
+    - `lazy_images (bool)`: if True, image entries of the observation are rendered only when they are read, and must
+        be read before the next step, default is False.
+    - `image_buffers (int)`: number of preallocated frames each camera renders into in turn. With 2, a consumer can
+        hold the previous frame while the next one is rendered, but must copy frames it keeps longer. Default is 0,
+        which allocates a new array for every frame.
+
+    `model (mujoco.MjModel)`: an already loaded model of the same scene to use instead of loading `xml_file`. Envs
+    built on one model share it and only own their `MjData`, this is how `BatchedEnv` runs many worlds.
+
+    `reset_pool`: settled initial states `reset` draws from instead of placing the objects and letting them settle
+    during the first steps. Either True for the pool `python -m gym_lowcostrobot.reset_pool <env_id>` saves by
+    default, the path of a saved pool, or an array of `get_state` states. Default is None, objects are placed by
+    `reset_task`.
+    """
+
+    metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 200}
+
+    # Task attributes that are part of the simulator state, with their flat sizes, saved after the MuJoCo state
+    task_state = {}
+
+    def __init__(
+        self,
+        xml_file,
+        observation_mode="image",
+        action_mode="joint",
+        render_mode=None,
+        ee_body_name="link_6",
+        task_subspaces=None,
+        state_subspaces=None,
+        camera_render_period=1,
+        lazy_images=False,
+        image_buffers=0,
+        model=None,
+        reset_pool=None,
+    ):
+        # Load the MuJoCo model and data, compiled models are cached on disk
+        self.xml_file = xml_file
+        if model is None:
+            model = model_cache.load_model(os.path.join(ASSETS_PATH, xml_file))
+        self.model = model
+        self.data = mujoco.MjData(self.model)
+
+        # Set the action space
+        self.action_mode = action_mode
+        action_shape = {"joint": 6, "ee": 4}[action_mode]
+        self.action_space = spaces.Box(low=-1.0, high=1.0, shape=(action_shape,), dtype=np.float32)
+
+        self.nb_dof = 6
+
+        # Set the observations space
+        self.observation_mode = observation_mode
+        observation_subspaces = {
+            "arm_qpos": spaces.Box(low=-np.pi, high=np.pi, shape=(6,)),
+            "arm_qvel": spaces.Box(low=-10.0, high=10.0, shape=(6,)),
+        }
+        observation_subspaces.update(task_subspaces or {})
+        if self.observation_mode in ["image", "both"]:
+            observation_subspaces["image_front"] = spaces.Box(0, 255, shape=(240, 320, 3), dtype=np.uint8)
+            observation_subspaces["image_top"] = spaces.Box(0, 255, shape=(240, 320, 3), dtype=np.uint8)
+            self.renderer = mujoco.Renderer(self.model)
+        if self.observation_mode in ["state", "both"]:
+            observation_subspaces.update(state_subspaces or {})
+        self.observation_space = gym.spaces.Dict(observation_subspaces)
+
+        # Set the render utilities
+        assert render_mode is None or render_mode in self.metadata["render_modes"]
+        self.render_mode = render_mode
+        if self.render_mode == "human":
+            self.viewer = viser_viewer.launch_passive(self.model, self.data)
+            self.viewer.cam.azimuth = -75
+            self.viewer.cam.distance = 1
+        elif self.render_mode == "rgb_array":
+            self.rgb_array_renderer = mujoco.Renderer(self.model, height=640, width=640)
+
+        # Resolve ids once, name lookups go through the MuJoCo bindings and are slow on the step path
+        self.ee_body_name = ee_body_name
+        self.ee_body_id = mujoco.mj_name2id(self.model, mujoco.mjtObj.mjOBJ_BODY, ee_body_name)
+        self.camera_vizu_id = self.model.camera("camera_vizu").id
+        self.camera_ids = {camera: self.model.camera(camera).id for camera in CAMERA_OBSERVATIONS}
+        self._cameras = {}
+        for camera, camera_id in self.camera_ids.items():
+            self._cameras[camera] = mujoco.MjvCamera()
+            self._cameras[camera].type = mujoco.mjtCamera.mjCAMERA_FIXED
+            self._cameras[camera].fixedcamid = camera_id
+
+        # Cameras are rendered at most once every `period` control steps, the last frame is served in between
+        if not isinstance(camera_render_period, dict):
+            camera_render_period = {camera: camera_render_period for camera in CAMERA_OBSERVATIONS}
+        self.camera_render_period = {
+            camera: int(camera_render_period.get(camera, 1)) for camera in CAMERA_OBSERVATIONS
+        }
+        if min(self.camera_render_period.values()) < 1:
+            raise ValueError(f"Camera render periods must be at least 1 step, got {camera_render_period}")
+        self.lazy_images = lazy_images
+        self._control_step = 0
+        self._frames = {}
+        self._rendered_at = {}
+
+        # Rotating output buffers, frames are rendered in place instead of into a new array each time
+        self._buffers = {
+            camera: [np.empty((240, 320, 3), dtype=np.uint8) for _ in range(image_buffers)]
+            for camera in CAMERA_OBSERVATIONS
+        }
+        self._next_buffer = {camera: 0 for camera in CAMERA_OBSERVATIONS}
+
+        # get dof addresses, read from the joints since free joints have 7 entries in qpos but 6 in qvel
+        self.arm_dof_id = self.qpos_adr(BASE_LINK_NAME)
+        self.arm_dof_vel_id = int(self.model.body(BASE_LINK_NAME).dofadr[0])
+
+        # Scratch buffers reused by every step
+        self._jac = np.zeros((3, self.model.nv))
+        self._eye = np.eye(self.nb_dof)
+        self._target_qpos = np.zeros(self.nb_dof)
+
+        self.control_decimation = 4 # number of simulation steps per control step
+
+        # Layout of the flat arrays of get_state / set_state
+        self._physics_state_size = mujoco.mj_stateSize(self.model, STATE_SPEC)
+        self.state_size = self._physics_state_size + sum(self.task_state.values())
+
+        if reset_pool is True:
+            reset_pool = reset_pools.default_path(xml_file)
+        if isinstance(reset_pool, (str, os.PathLike)):
+            reset_pool = reset_pools.load(reset_pool, xml_file, self.state_size)
+        elif reset_pool is not None and np.shape(reset_pool)[1:] != (self.state_size,):
+            raise ValueError(f"Reset pool states must have {self.state_size} values, got {np.shape(reset_pool)[1:]}")
+        self.reset_pool = reset_pool
+
+    def qpos_adr(self, body_name):
+        # Address in qpos of the first joint of a body
+        return int(self.model.jnt_qposadr[self.model.body(body_name).jntadr[0]])
+
+    def inverse_kinematics(
+        self,
+        ee_target_pos,
+        step=0.2,
+        joint_name=None,
+        nb_dof=6,
+        regularization=1e-6,
+        home_position=None,
+        nullspace_weight=0.0,
+    ):
+        """
+        Computes the inverse kinematics for a robotic arm to reach the target end effector position.
+
+        :param ee_target_pos: numpy array of target end effector position [x, y, z]
+        :param step: float, step size for the iteration
+        :param joint_name: str, name of the end effector joint, defaults to the env's end effector body
+        :param nb_dof: int, number of degrees of freedom
+        :param regularization: float, regularization factor for the pseudoinverse computation
+        :param home_position: numpy array of home joint positions to regularize towards
+        :param nullspace_weight: float, weight for the nullspace regularization, disabled by default
+        :return: numpy array of target joint positions
+        """
+        if joint_name is None or joint_name == self.ee_body_name:
+            joint_id = self.ee_body_id
+        else:
+            try:
+                # Get the joint ID from the name
+                joint_id = self.model.body(joint_name).id
+            except KeyError:
+                raise ValueError(f"Body name '{joint_name}' not found in the model.")
+
+        # Get the current end effector position
+        ee_pos = self.data.geom_xpos[joint_id]
+
+        # Compute the Jacobian
+        jac = self._jac
+        mujoco.mj_jacBodyCom(self.model, self.data, jac, None, joint_id)
+
+        # Compute the difference between target and current end effector positions
+        delta_pos = ee_target_pos - ee_pos
+
+        # Compute the pseudoinverse of the Jacobian with regularization
+        eye = self._eye if nb_dof == self.nb_dof else np.eye(nb_dof)
+        jac_reg = jac[:, :nb_dof].T @ jac[:, :nb_dof] + regularization * eye
+        jac_pinv = np.linalg.inv(jac_reg) @ jac[:, :nb_dof].T
+
+        # Compute target joint velocities
+        qdot = jac_pinv @ delta_pos
+
+        # Read the current joint positions
+        qpos = self.data.qpos[self.arm_dof_id:self.arm_dof_id+nb_dof]
+
+        # Add nullspace regularization to keep joint positions close to the home position
+        if nullspace_weight:
+            if home_position is None:
+                home_position = np.zeros(nb_dof)
+            qdot += nullspace_weight * (home_position - qpos)
+
+        # Normalize joint velocities to avoid excessive movements
+        qdot_norm = np.linalg.norm(qdot)
+        if qdot_norm > 1.0:
+            qdot /= qdot_norm
+
+        # Compute the new joint positions
+        q_target_pos = qpos + qdot * step
+
+        return q_target_pos
+
+    def apply_action(self, action):
+        """
+        Step the simulation forward based on the action
+
+        Action shape
+        - EE mode: [dx, dy, dz, gripper]
+        - Joint mode: [q1, q2, q3, q4, q5, q6, gripper]
+        """
+        if self.action_mode == "ee":
+            if self.ee_body_id < 0:
+                raise ValueError(f"Body name '{self.ee_body_name}' not found in the model.")
+            ee_action, gripper_action = action[:3], action[-1]
+
+            # Update the robot position based on the action
+            ee_target_pos = self.data.xpos[self.ee_body_id] + ee_action
+
+            # Use inverse kinematics to get the joint action wrt the end effector current position and displacement
+            target_qpos = self.inverse_kinematics(ee_target_pos=ee_target_pos)
+            target_qpos[-1:] = gripper_action
+        elif self.action_mode == "joint":
+            target_qpos = np.clip(action, JOINT_LOW, JOINT_HIGH, out=self._target_qpos)
+        else:
+            raise ValueError("Invalid action mode, must be 'ee' or 'joint'")
+
+        # Set the target position
+        self.data.ctrl[:] = target_qpos
+
+        # Step the simulation forward
+        self._control_step += 1
+        for _ in range(self.control_decimation):
+            mujoco.mj_step(self.model, self.data)
+
+        # The viewer only snapshots the poses here, it sends them to the browser at its own frame rate
+        if self.render_mode == "human":
+            self.viewer.sync()
+
+    def get_observation(self):
+        observation = {
+            "arm_qpos": self.data.qpos[self.arm_dof_id:self.arm_dof_id+self.nb_dof].astype(np.float32),
+            "arm_qvel": self.data.qvel[self.arm_dof_vel_id:self.arm_dof_vel_id+self.nb_dof].astype(np.float32),
+        }
+        observation.update(self.get_task_observation())
+        lazy = {}
+        if self.observation_mode in ["image", "both"]:
+            for camera, key in CAMERA_OBSERVATIONS.items():
+                rendered_at = self._rendered_at.get(camera)
+                if rendered_at is not None and self._control_step - rendered_at < self.camera_render_period[camera]:
+                    observation[key] = self._frames[camera]
+                elif self.lazy_images:
+                    observation[key] = None
+                    lazy[key] = functools.partial(self.render_camera, camera, self._control_step)
+                else:
+                    observation[key] = self.render_camera(camera, self._control_step)
+        if self.observation_mode in ["state", "both"]:
+            observation.update(self.get_state_observation())
+        return LazyObservation(observation, lazy) if lazy else observation
+
+    def render_camera(self, camera, control_step=None):
+        # A lazy image is only valid for the step it was observed at, the simulator has moved on afterwards
+        if control_step is not None and control_step != self._control_step:
+            raise RuntimeError(
+                f"{CAMERA_OBSERVATIONS[camera]} of step {control_step} read after the env moved on to step "
+                f"{self._control_step}, lazy images must be read before the next step"
+            )
+        self.renderer.update_scene(self.data, camera=self._cameras[camera])
+
+        out = None
+        buffers = self._buffers[camera]
+        if buffers:
+            out = buffers[self._next_buffer[camera]]
+            self._next_buffer[camera] = (self._next_buffer[camera] + 1) % len(buffers)
+        frame = self.renderer.render(out=out)
+        self._frames[camera] = frame
+        self._rendered_at[camera] = self._control_step
+        return frame
+
+    def set_image_buffers(self, buffers):
+        # Replaces the rotating buffers of some cameras with caller-owned (240, 320, 3) uint8 arrays (shared memory)
+        for camera, arrays in buffers.items():
+            for array in arrays:
+                if array.shape != (240, 320, 3) or array.dtype != np.uint8 or not array.flags.c_contiguous:
+                    raise ValueError(f"Image buffers of {camera} must be contiguous (240, 320, 3) uint8 arrays")
+            self._buffers[camera] = list(arrays)
+            self._next_buffer[camera] = 0
+
+    def get_task_observation(self):
+        # Entries present in every observation mode
+        return {}
+
+    def get_state_observation(self):
+        # Entries only present in the "state" and "both" observation modes
+        return {}
+
+    def reset(self, seed=None, options=None):
+        # We need the following line to seed self.np_random
+        super().reset(seed=seed, options=options)
+
+        # A pooled state is already settled, restoring it also invalidates the held frames
+        if self.reset_pool is not None:
+            self.set_state(self.reset_pool[self.np_random.integers(len(self.reset_pool))])
+            return self.get_observation(), {}
+
+        # Reset the robot to the initial position and let the task place its objects
+        self.data.qpos[self.arm_dof_id:self.arm_dof_id+self.nb_dof] = 0.0
+        self.reset_task()
+
+        # Frames held from the previous episode are stale, the first observation renders every camera
+        self._control_step += 1
+        self._rendered_at.clear()
+
+        # Step the simulation
+        mujoco.mj_forward(self.model, self.data)
+        if self.render_mode == "human":
+            self.viewer.sync(static=True)
+
+        return self.get_observation(), {}
+
+    def reset_task(self):
+        raise NotImplementedError
+
+    def restore_task(self):
+        # Called by set_state once the task attributes are restored, to apply them to the model (e.g. target markers)
+        pass
+
+    def get_state(self, out=None):
+        """
+        Captures the full simulator state as one flat float64 array of `state_size` values: the MuJoCo integration
+        state (time, qpos, qvel, act, ctrl, ...) followed by the task attributes listed in `task_state`.
+
+        :param out: optional array of `state_size` values to write the state into instead of a new array
+        :return: numpy array holding the state
+        """
+        state = np.empty(self.state_size) if out is None else out
+        mujoco.mj_getState(self.model, self.data, state[:self._physics_state_size], STATE_SPEC)
+        offset = self._physics_state_size
+        for name, size in self.task_state.items():
+            state[offset:offset+size] = getattr(self, name)
+            offset += size
+        return state
+
+    def set_state(self, state):
+        """
+        Restores a state captured by `get_state`, stepping from it again reproduces the same trajectory.
+
+        :param state: numpy array of `state_size` values
+        """
+        state = np.asarray(state, dtype=np.float64)
+        if state.shape != (self.state_size,):
+            raise ValueError(f"Expected a state of shape ({self.state_size},), got {state.shape}")
+        mujoco.mj_setState(self.model, self.data, state[:self._physics_state_size], STATE_SPEC)
+        offset = self._physics_state_size
+        for name, size in self.task_state.items():
+            value = state[offset:offset+size]
+            offset += size
+            # Keep the type of the attribute, and never write into an array a past observation may hold
+            current = getattr(self, name, None)
+            if isinstance(current, np.ndarray):
+                setattr(self, name, value.astype(current.dtype))
+            elif current is not None:
+                setattr(self, name, type(current)(value[0]))
+            else:
+                setattr(self, name, value.copy() if size > 1 else float(value[0]))
+
+        self.restore_task()
+
+        # Recompute positions from the restored qpos, frames rendered before the jump are stale
+        mujoco.mj_forward(self.model, self.data)
+        self._control_step += 1
+        self._rendered_at.clear()
+        if self.render_mode == "human":
+            self.viewer.sync(static=True)
+
+    def step(self, action):
+        # Perform the action and step the simulation
+        self.apply_action(action)
+
+        # Get the new observation
+        observation = self.get_observation()
+
+        reward = self.compute_reward()
+        return observation, reward, False, False, {}
+
+    def compute_reward(self):
+        raise NotImplementedError
+
+    def render(self):
+        if self.render_mode == "human":
+            self.viewer.sync()
+        elif self.render_mode == "rgb_array":
+            self.rgb_array_renderer.update_scene(self.data, camera=self.camera_vizu_id)
+            return self.rgb_array_renderer.render()
+
+    def close(self):
+        if self.render_mode == "human":
+            self.viewer.close()
+        if self.observation_mode in ["image", "both"]:
+            self.renderer.close()
+        if self.render_mode == "rgb_array":
+            self.rgb_array_renderer.close()
@@ -0,0 +1,182 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+
+import gymnasium as gym
+import numpy as np
+from gymnasium.envs.registration import load_env_creator
+from gymnasium.vector import AutoresetMode, VectorEnv
+from gymnasium.vector.utils import batch_space, create_empty_array
+
+
+class BatchedEnv(VectorEnv):
+    """
+    ## Description
+
+    Runs `num_envs` worlds of one task in a single process. Every world is a task env with its own `MjData`, all of
+    them built on one shared `MjModel`, and a step advances them together on a thread pool: `mj_step` releases the
+    GIL, so the physics of different worlds runs in parallel while the Python side of the step stays cheap.
+    Observations, rewards, terminations and truncations come back stacked along a leading `num_envs` axis.
+
+    It follows the Gymnasium vector API, with the `NEXT_STEP` autoreset mode of `SyncVectorEnv`: the step after a
+    world's episode ended resets it, ignoring its action, and returns its first observation with a zero reward.
+    Those resets run on the calling thread before the other worlds are stepped, as they write to the shared model.
+    Every registered task can be batched with `gym.make_vec(env_id, num_envs, vectorization_mode="vector_entry_point")`.
+
+    Only the "state" observation mode is supported: target regions are moved in the shared model on reset, so
+    rendered images of one world would show the targets of another.
+
+    ## Arguments
+
+    - `env_id (str)`: id of the registered task, e.g. "LiftCube-v0".
+    - `num_envs (int)`: number of worlds.
+    - `max_episode_steps (int)`: steps after which an episode is truncated, default is the task's registered limit.
+    - `num_threads (int)`: threads stepping the worlds, each one steps a contiguous slice of them. Default is the
+        number of CPUs, capped to `num_envs`. With 1 the worlds are stepped on the calling thread.
+    - `copy (bool)`: if True, default, observations are copies, otherwise the arrays the next step writes into.
+    - `**kwargs`: passed to every task env, e.g. `action_mode`.
+    """
+
+    metadata = {"autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(self, env_id, num_envs, max_episode_steps=None, num_threads=None, copy=True, **kwargs):
+        spec = gym.spec(env_id)
+        kwargs = {**spec.kwargs, **kwargs}
+        if kwargs.setdefault("observation_mode", "state") != "state":
+            raise ValueError(f"BatchedEnv only supports the 'state' observation mode, got {kwargs['observation_mode']}")
+        if kwargs.get("render_mode") is not None:
+            raise ValueError("BatchedEnv worlds cannot be rendered")
+
+        # The first world loads the model, the others only allocate their MjData on it
+        env_class = load_env_creator(spec.entry_point)
+        first = env_class(**kwargs)
+        self.envs = [first] + [env_class(model=first.model, **kwargs) for _ in range(num_envs - 1)]
+        self.model = first.model
+
+        self.num_envs = num_envs
+        self.max_episode_steps = max_episode_steps if max_episode_steps is not None else spec.max_episode_steps
+        self.copy = copy
+        self.single_observation_space = first.observation_space
+        self.single_action_space = first.action_space
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+        self.metadata = {**first.metadata, **self.metadata}
+        self.render_mode = None
+        self.spec = spec
+
+        # Stacked outputs, worlds write their own row in place
+        self._observations = create_empty_array(self.single_observation_space, num_envs)
+        self._rewards = np.zeros(num_envs, dtype=np.float64)
+        self._terminations = np.zeros(num_envs, dtype=np.bool_)
+        self._truncations = np.zeros(num_envs, dtype=np.bool_)
+        self._autoreset_envs = np.zeros(num_envs, dtype=np.bool_)
+        self._episode_steps = np.zeros(num_envs, dtype=np.int64)
+        self._infos = [None] * num_envs
+
+        self.num_threads = min(num_threads or os.cpu_count() or 1, num_envs)
+        self._slices = [chunk.tolist() for chunk in np.array_split(np.arange(num_envs), self.num_threads)]
+        self._executor = ThreadPoolExecutor(self.num_threads, "BatchedEnv") if self.num_threads > 1 else None
+
+    def reset(self, seed=None, options=None):
+        if seed is None or isinstance(seed, int):
+            seeds = [None if seed is None else seed + i for i in range(self.num_envs)]
+        else:
+            seeds = list(seed)
+            if len(seeds) != self.num_envs:
+                raise ValueError(f"Expected {self.num_envs} seeds, got {len(seeds)}")
+
+        options = dict(options or {})
+        reset_mask = options.pop("reset_mask", None)
+        if reset_mask is None:
+            reset_mask = np.ones(self.num_envs, dtype=np.bool_)
+        elif not np.any(reset_mask):
+            raise ValueError(f"`options['reset_mask']` must reset at least one world, got {reset_mask}")
+
+        indices = np.flatnonzero(reset_mask).tolist()
+        for i in indices:
+            observation, self._infos[i] = self.envs[i].reset(seed=seeds[i], options=options or None)
+            self._write_observation(i, observation)
+        self._terminations[reset_mask] = False
+        self._truncations[reset_mask] = False
+        self._autoreset_envs[reset_mask] = False
+        self._episode_steps[reset_mask] = 0
+
+        return self._output_observations(), self._collect_infos(indices)
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        # Resets write target poses into the shared model, which the pool threads read in mj_step, so worlds whose
+        # episode ended are reset here before the others are stepped
+        for i in np.flatnonzero(self._autoreset_envs).tolist():
+            observation, self._infos[i] = self.envs[i].reset()
+            self._write_observation(i, observation)
+            self._rewards[i] = 0.0
+            self._terminations[i] = False
+            self._episode_steps[i] = 0
+
+        if self._executor is None:
+            self._step_worlds(self._slices[0], actions)
+        else:
+            for future in [self._executor.submit(self._step_worlds, worlds, actions) for worlds in self._slices]:
+                future.result()
+
+        if self.max_episode_steps is not None:
+            np.greater_equal(self._episode_steps, self.max_episode_steps, out=self._truncations)
+        np.logical_or(self._terminations, self._truncations, out=self._autoreset_envs)
+
+        return (
+            self._output_observations(),
+            self._rewards.copy(),
+            self._terminations.copy(),
+            self._truncations.copy(),
+            self._collect_infos(range(self.num_envs)),
+        )
+
+    def _step_worlds(self, worlds, actions):
+        # Runs on a pool thread, every world only touches its own MjData and its own row of the outputs
+        for i in worlds:
+            if self._autoreset_envs[i]:
+                continue
+            observation, reward, terminated, _, info = self.envs[i].step(actions[i])
+            self._episode_steps[i] += 1
+            self._write_observation(i, observation)
+            self._rewards[i] = reward
+            self._terminations[i] = terminated
+            self._infos[i] = info
+
+    def _write_observation(self, i, observation):
+        for key, value in observation.items():
+            self._observations[key][i] = value
+
+    def _output_observations(self):
+        return deepcopy(self._observations) if self.copy else self._observations
+
+    def _collect_infos(self, worlds):
+        infos = {}
+        for i in worlds:
+            if self._infos[i]:
+                infos = self._add_info(infos, self._infos[i], i)
+            self._infos[i] = None
+        return infos
+
+    def call(self, name, *args, **kwargs):
+        results = []
+        for env in self.envs:
+            attribute = getattr(env, name)
+            results.append(attribute(*args, **kwargs) if callable(attribute) else attribute)
+        return tuple(results)
+
+    def get_attr(self, name):
+        return tuple(getattr(env, name) for env in self.envs)
+
+    def set_attr(self, name, values):
+        if not isinstance(values, (list, tuple)):
+            values = [values] * self.num_envs
+        for env, value in zip(self.envs, values):
+            setattr(env, name, value)
+
+    def close_extras(self, **kwargs):
+        if self._executor is not None:
+            self._executor.shutdown()
+        for env in self.envs:
+            env.close()
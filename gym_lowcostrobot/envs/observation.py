@@ -0,0 +1,67 @@
+from collections.abc import ItemsView, ValuesView
+
+
+class LazyObservation(dict):
+    """
+    Observation dict whose lazy entries are computed the first time they are read.
+
+    It behaves as a plain dict for every consumer: indexing, `get`, iteration over items or values, copies and
+    pickling all resolve the pending entries first, while code that never reads them never pays for them.
+    """
+
+    def __init__(self, observation, lazy):
+        super().__init__(observation)
+        self._lazy = dict(lazy)
+        for key in self._lazy:
+            super().setdefault(key, None)
+
+    def __getitem__(self, key):
+        if key in self._lazy:
+            super().__setitem__(key, self._lazy.pop(key)())
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        self._lazy.pop(key, None)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._lazy.pop(key, None)
+        super().__delitem__(key)
+
+    def __iter__(self):
+        # Defining __iter__ keeps dict(obs) and {**obs} off CPython's raw-copy fast path, so they go through __getitem__
+        return super().__iter__()
+
+    def __reduce__(self):
+        return dict, (self.copy(),)
+
+    def __repr__(self):
+        pending = {key: "<not rendered>" for key in self._lazy}
+        return repr({key: pending.get(key, value) for key, value in super().items()})
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default  # noqa: SIM401, self.get would recurse into this method
+
+    def pop(self, key, *default):
+        if key in self._lazy:
+            self[key]
+        return super().pop(key, *default)
+
+    def update(self, *args, **kwargs):
+        # dict.update bypasses __setitem__, which would leave the replaced entries pending
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def items(self):
+        return ItemsView(self)
+
+    def values(self):
+        return ValuesView(self)
+
+    def copy(self):
+        return {key: self[key] for key in self}
+
+    @property
+    def pending(self):
+        # Keys that have not been computed yet
+        return set(self._lazy)
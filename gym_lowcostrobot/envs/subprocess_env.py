@@ -0,0 +1,299 @@
+import multiprocessing
+import os
+import traceback
+from copy import deepcopy
+
+import gymnasium as gym
+import numpy as np
+from gymnasium.envs.registration import load_env_creator
+from gymnasium.vector import AutoresetMode, VectorEnv
+from gymnasium.vector.utils import batch_space
+
+from .base_env import CAMERA_OBSERVATIONS
+
+# Every array in the arena starts on its own cache line
+_ALIGNMENT = 64
+
+
+def _arena_layout(arrays, num_envs):
+    # Byte offset, stacked shape and dtype of each named array, and the arena size
+    layout = {}
+    offset = 0
+    for name, (shape, dtype) in arrays.items():
+        shape = (num_envs, *shape)
+        layout[name] = (offset, shape, np.dtype(dtype))
+        offset += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // _ALIGNMENT) * _ALIGNMENT
+    return layout, max(offset, 1)
+
+
+def _arena_views(arena, layout):
+    return {
+        name: np.frombuffer(arena, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+        for name, (offset, shape, dtype) in layout.items()
+    }
+
+
+def _worker(env_id, kwargs, worlds, arena, layout, max_episode_steps, pipe, parent_pipe):
+    parent_pipe.close()
+    views = _arena_views(arena, layout)
+    observation_keys = [key for key in layout if key not in ("actions", "rewards", "terminations", "truncations")]
+    try:
+        env_class = load_env_creator(gym.spec(env_id).entry_point)
+        envs = {i: env_class(**kwargs) for i in worlds}
+        # Cameras render straight into this world's row of the arena
+        rows = {i: {key: views[key][i] for key in observation_keys} for i in worlds}
+        for i, env in envs.items():
+            env.set_image_buffers(
+                {camera: [rows[i][key]] for camera, key in CAMERA_OBSERVATIONS.items() if key in rows[i]}
+            )
+        episode_steps = dict.fromkeys(worlds, 0)
+        autoreset = dict.fromkeys(worlds, False)
+        pipe.send(("ready", None))
+    except Exception:
+        pipe.send(("error", traceback.format_exc()))
+        pipe.close()
+        return
+
+    def write_observation(i, observation):
+        for key in observation_keys:
+            value = observation[key]
+            row = rows[i][key]
+            # Rendered and held frames are already in place
+            if value is not row:
+                row[...] = value
+
+    while True:
+        try:
+            command, payload = pipe.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        try:
+            infos = {}
+            if command == "reset":
+                seeds, options = payload
+                for i in worlds:
+                    if i not in seeds:
+                        continue
+                    observation, info = envs[i].reset(seed=seeds[i], options=options)
+                    write_observation(i, observation)
+                    views["terminations"][i] = views["truncations"][i] = False
+                    episode_steps[i], autoreset[i] = 0, False
+                    if info:
+                        infos[i] = info
+                pipe.send(("ok", infos))
+            elif command == "step":
+                for i in worlds:
+                    if autoreset[i]:
+                        observation, info = envs[i].reset()
+                        reward, terminated, truncated = 0.0, False, False
+                        episode_steps[i] = 0
+                    else:
+                        observation, reward, terminated, truncated, info = envs[i].step(views["actions"][i])
+                        episode_steps[i] += 1
+                        if max_episode_steps is not None:
+                            truncated = truncated or episode_steps[i] >= max_episode_steps
+                    write_observation(i, observation)
+                    views["rewards"][i] = reward
+                    views["terminations"][i] = terminated
+                    views["truncations"][i] = truncated
+                    autoreset[i] = terminated or truncated
+                    if info:
+                        infos[i] = info
+                pipe.send(("ok", infos))
+            elif command == "call":
+                name, args, call_kwargs = payload
+                results = {}
+                for i, env in envs.items():
+                    attribute = getattr(env, name)
+                    results[i] = attribute(*args, **call_kwargs) if callable(attribute) else attribute
+                pipe.send(("ok", results))
+            elif command == "set_attr":
+                name, values = payload
+                for i, env in envs.items():
+                    setattr(env, name, values[i])
+                pipe.send(("ok", None))
+            elif command == "close":
+                for env in envs.values():
+                    env.close()
+                pipe.send(("ok", None))
+                break
+        except Exception:
+            pipe.send(("error", traceback.format_exc()))
+    pipe.close()
+
+
+class SubprocessEnv(VectorEnv):
+    """
+    ## Description
+
+    Runs `num_envs` worlds of one task across worker processes, for image observations whose rendering is too heavy
+    for one process. Each worker steps a contiguous slice of the worlds and every camera renders straight into a
+    shared-memory arena holding the stacked observations, rewards and flags of all worlds. Only the command and the
+    (usually empty) infos go through a pipe, so observations are never pickled, and the parent returns views of the
+    arena without copying them.
+
+    It follows the Gymnasium vector API, with the `NEXT_STEP` autoreset mode of `SyncVectorEnv`: the step after a
+    world's episode ended resets it, ignoring its action, and returns its first observation with a zero reward.
+
+    Unlike `BatchedEnv`, every world has its own model, so images always show the world's own target.
+
+    ## Arguments
+
+    - `env_id (str)`: id of the registered task, e.g. "LiftCube-v0".
+    - `num_envs (int)`: number of worlds.
+    - `max_episode_steps (int)`: steps after which an episode is truncated, default is the task's registered limit.
+    - `num_workers (int)`: worker processes, default is the number of CPUs, capped to `num_envs`.
+    - `copy (bool)`: if False, default, observations are views of the arena that the next `reset` or `step`
+        overwrites, otherwise they are copies.
+    - `context (str)`: multiprocessing start method, default is "spawn" since each worker creates its own GL context
+        and a context does not survive a fork.
+    - `**kwargs`: passed to every task env, e.g. `observation_mode` or `camera_render_period`. Images are always
+        rendered eagerly, `lazy_images` and `image_buffers` are not supported.
+    """
+
+    metadata = {"autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(
+        self, env_id, num_envs, max_episode_steps=None, num_workers=None, copy=False, context="spawn", **kwargs
+    ):
+        spec = gym.spec(env_id)
+        kwargs = {**spec.kwargs, **kwargs}
+        if kwargs.get("render_mode") is not None:
+            raise ValueError("SubprocessEnv worlds cannot be rendered")
+        if kwargs.get("lazy_images") or kwargs.get("image_buffers"):
+            raise ValueError("SubprocessEnv renders images into shared memory, drop lazy_images and image_buffers")
+
+        # A throwaway env in the parent gives the spaces, it is closed before any worker starts
+        probe = load_env_creator(spec.entry_point)(**kwargs)
+        single_observation_space = probe.observation_space
+        single_action_space = probe.action_space
+        metadata = probe.metadata
+        probe.close()
+
+        self.num_envs = num_envs
+        self.max_episode_steps = max_episode_steps if max_episode_steps is not None else spec.max_episode_steps
+        self.copy = copy
+        self.single_observation_space = single_observation_space
+        self.single_action_space = single_action_space
+        self.observation_space = batch_space(single_observation_space, num_envs)
+        self.action_space = batch_space(single_action_space, num_envs)
+        self.metadata = {**metadata, **self.metadata}
+        self.render_mode = None
+        self.spec = spec
+
+        # One arena holds every stacked array, workers and parent map the same pages
+        arrays = {key: (space.shape, space.dtype) for key, space in single_observation_space.spaces.items()}
+        arrays["actions"] = (single_action_space.shape, single_action_space.dtype)
+        arrays["rewards"] = ((), np.float64)
+        arrays["terminations"] = ((), np.bool_)
+        arrays["truncations"] = ((), np.bool_)
+        layout, size = _arena_layout(arrays, num_envs)
+        ctx = multiprocessing.get_context(context)
+        self._arena = ctx.RawArray("B", size)
+        self._views = _arena_views(self._arena, layout)
+        self._observations = {key: self._views[key] for key in single_observation_space.spaces}
+
+        num_workers = min(num_workers or os.cpu_count() or 1, num_envs)
+        self._slices = [chunk.tolist() for chunk in np.array_split(np.arange(num_envs), num_workers)]
+        self._pipes = []
+        self._processes = []
+        for worlds in self._slices:
+            parent_pipe, child_pipe = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                name=f"SubprocessEnv-{worlds[0]}",
+                args=(env_id, kwargs, worlds, self._arena, layout, self.max_episode_steps, child_pipe, parent_pipe),
+                daemon=True,
+            )
+            process.start()
+            child_pipe.close()
+            self._pipes.append(parent_pipe)
+            self._processes.append(process)
+        self.closed = False
+        self._receive()
+
+    def _send(self, command, payload=None):
+        for pipe in self._pipes:
+            pipe.send((command, payload))
+
+    def _receive(self):
+        results = []
+        errors = []
+        for pipe in self._pipes:
+            status, payload = pipe.recv()
+            if status == "error":
+                errors.append(payload)
+            else:
+                results.append(payload)
+        if errors:
+            raise RuntimeError(f"SubprocessEnv worker failed:\n{errors[0]}")
+        return results
+
+    def _collect_infos(self, results):
+        infos = {}
+        for worker_infos in results:
+            for i, info in worker_infos.items():
+                infos = self._add_info(infos, info, i)
+        return infos
+
+    def _output_observations(self):
+        return deepcopy(self._observations) if self.copy else self._observations
+
+    def reset(self, seed=None, options=None):
+        if seed is None or isinstance(seed, int):
+            seeds = [None if seed is None else seed + i for i in range(self.num_envs)]
+        else:
+            seeds = list(seed)
+            if len(seeds) != self.num_envs:
+                raise ValueError(f"Expected {self.num_envs} seeds, got {len(seeds)}")
+
+        options = dict(options or {})
+        reset_mask = options.pop("reset_mask", None)
+        if reset_mask is None:
+            reset_mask = np.ones(self.num_envs, dtype=np.bool_)
+        elif not np.any(reset_mask):
+            raise ValueError(f"`options['reset_mask']` must reset at least one world, got {reset_mask}")
+
+        self._send("reset", ({i: seeds[i] for i in np.flatnonzero(reset_mask).tolist()}, options or None))
+        return self._output_observations(), self._collect_infos(self._receive())
+
+    def step(self, actions):
+        self._views["actions"][...] = actions
+        self._send("step")
+        infos = self._collect_infos(self._receive())
+        return (
+            self._output_observations(),
+            self._views["rewards"].copy(),
+            self._views["terminations"].copy(),
+            self._views["truncations"].copy(),
+            infos,
+        )
+
+    def call(self, name, *args, **kwargs):
+        self._send("call", (name, args, kwargs))
+        results = {}
+        for worker_results in self._receive():
+            results.update(worker_results)
+        return tuple(results[i] for i in range(self.num_envs))
+
+    def get_attr(self, name):
+        return self.call(name)
+
+    def set_attr(self, name, values):
+        if not isinstance(values, (list, tuple)):
+            values = [values] * self.num_envs
+        self._send("set_attr", (name, dict(enumerate(values))))
+        self._receive()
+
+    def close_extras(self, **kwargs):
+        try:
+            self._send("close")
+            self._receive()
+        except (BrokenPipeError, EOFError, RuntimeError):
+            pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for pipe in self._pipes:
+            pipe.close()
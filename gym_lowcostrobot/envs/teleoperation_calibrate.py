@@ -3,7 +3,7 @@ import argparse
 import numpy as np
 
 import mujoco
-from gym_lowcostrobot import viser_viewer
+from gym_lowcostrobot import model_cache, viser_viewer
 
 from lerobot.common.robot_devices.motors.dynamixel import DynamixelMotorsBus
 from lerobot.common.robot_devices.robots.koch import KochRobot
@@ -46,7 +46,7 @@ class SimDynamixelMotorsBus:
     ):
         
         self.path_scene = path_scene
-        self.model = mujoco.MjModel.from_xml_path(path_scene)
+        self.model = model_cache.load_model(path_scene)
         self.data  = mujoco.MjData(self.model)
         self.is_connected = False
         self.motors = motors
@@ -4,7 +4,7 @@ import numpy as np
 from tqdm import tqdm
 
 import mujoco
-from gym_lowcostrobot import viser_viewer
+from gym_lowcostrobot import model_cache, viser_viewer
 
 import argparse
 import copy
@@ -101,7 +101,7 @@ class SimDynamixelMotorsBus:
     ):
         
         self.path_scene = path_scene
-        self.model = mujoco.MjModel.from_xml_path(path_scene)
+        self.model = model_cache.load_model(path_scene)
         self.data  = mujoco.MjData(self.model)
         self.is_connected = False
         self.motors = motors
@@ -0,0 +1,184 @@
+import contextlib
+import ctypes.util
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+from pathlib import Path
+
+# Offscreen backends in order of preference on headless Linux, EGL drives both GPUs and Mesa's llvmpipe
+BACKENDS = ("egl", "osmesa", "glfw")
+
+# Forces a backend (or "auto") and takes precedence over MUJOCO_GL and the saved benchmark result
+OVERRIDE_ENV = "LOWCOSTROBOT_GL"
+
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser() / "gym_lowcostrobot"
+PREFERENCE_PATH = CACHE_DIR / "gl_backend.json"
+
+# Set by select_backend(), which the package runs on import
+selected = None
+source = None
+
+
+def is_available(backend):
+    # Cheap capability probe: the native library (or the glfw bindings and a display) must be there
+    if backend == "egl":
+        return ctypes.util.find_library("EGL") is not None
+    if backend == "osmesa":
+        return ctypes.util.find_library("OSMesa") is not None
+    if backend == "glfw":
+        has_display = platform.system() != "Linux" or "DISPLAY" in os.environ or "WAYLAND_DISPLAY" in os.environ
+        return has_display and importlib.util.find_spec("glfw") is not None
+    raise ValueError(f"Unknown GL backend '{backend}', expected one of {BACKENDS}")
+
+
+def can_create_context(backend, timeout=60):
+    # An installed library can still fail to give a context (libEGL without a driver, no GPU device), so actually
+    # create one. Done in a fresh interpreter, a process can only ever load one GL platform
+    code = "import mujoco; mujoco.GLContext(1, 1).make_current()"
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", code], env=_backend_env(backend), capture_output=True, timeout=timeout, check=False
+        )
+    except subprocess.TimeoutExpired:
+        return False
+    return result.returncode == 0
+
+
+def available_backends():
+    return [backend for backend in BACKENDS if is_available(backend)]
+
+
+def _saved_backend():
+    try:
+        backend = json.loads(PREFERENCE_PATH.read_text())["backend"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return backend if backend in BACKENDS and is_available(backend) else None
+
+
+def _choose():
+    override = os.environ.get(OVERRIDE_ENV, "auto").lower().strip()
+    if override != "auto":
+        if override not in BACKENDS:
+            raise ValueError(f"Invalid {OVERRIDE_ENV}={override!r}, expected 'auto' or one of {BACKENDS}")
+        return override, OVERRIDE_ENV
+    if os.environ.get("MUJOCO_GL"):
+        return os.environ["MUJOCO_GL"].lower().strip(), "MUJOCO_GL"
+    # mujoco's EGL and OSMesa contexts refuse to load when PyOpenGL was pinned to another platform
+    platform_hint = os.environ.get("PYOPENGL_PLATFORM", "").lower().strip()
+    if platform_hint in BACKENDS and is_available(platform_hint):
+        return platform_hint, "PYOPENGL_PLATFORM"
+    # Only Linux lets MuJoCo pick between several contexts, and with a display its GLFW default already works
+    if platform.system() != "Linux" or is_available("glfw"):
+        return None, "mujoco default"
+    saved = _saved_backend()
+    if saved is not None:
+        return saved, str(PREFERENCE_PATH)
+    for backend in BACKENDS:
+        if is_available(backend) and can_create_context(backend):
+            # Saved like a benchmark result so later imports skip the subprocess, a read-only cache only costs
+            # the probe again on the next import
+            with contextlib.suppress(OSError):
+                _save_backend(backend, results=[])
+            return backend, "probe"
+    return None, "probe (no offscreen backend found)"
+
+
+def select_backend():
+    # MuJoCo reads MUJOCO_GL once, when mujoco is first imported, so this has to run before that
+    global selected, source
+    backend, source = _choose()
+    if "mujoco" in sys.modules:
+        if source == OVERRIDE_ENV and backend != os.environ.get("MUJOCO_GL", "").lower():
+            warnings.warn(f"{OVERRIDE_ENV}={backend} ignored, mujoco was imported before gym_lowcostrobot")
+        selected, source = os.environ.get("MUJOCO_GL") or None, "mujoco imported first"
+        return selected
+    if backend is not None:
+        os.environ["MUJOCO_GL"] = backend
+    selected = backend
+    return selected
+
+
+def _render_worker(frames, width, height):
+    # Runs inside a fresh interpreter whose MUJOCO_GL was set by the parent
+    import mujoco
+
+    from gym_lowcostrobot import ASSETS_PATH
+
+    model = mujoco.MjModel.from_xml_path(os.path.join(ASSETS_PATH, "lift_cube.xml"))
+    data = mujoco.MjData(model)
+    mujoco.mj_forward(model, data)
+
+    start = time.perf_counter()
+    renderer = mujoco.Renderer(model, height, width)
+    renderer.update_scene(data, camera="camera_front")
+    renderer.render()
+    init_time = time.perf_counter() - start
+
+    try:
+        from OpenGL import GL
+
+        gl_renderer = GL.glGetString(GL.GL_RENDERER).decode()
+    except Exception:
+        gl_renderer = "unknown"
+
+    cameras = ("camera_front", "camera_top")
+    start = time.perf_counter()
+    for i in range(frames):
+        renderer.update_scene(data, camera=cameras[i % len(cameras)])
+        renderer.render()
+    elapsed = time.perf_counter() - start
+    renderer.close()
+
+    print(json.dumps({"fps": frames / elapsed, "init_time": init_time, "gl_renderer": gl_renderer}))
+
+
+def _backend_env(backend):
+    env = dict(os.environ, MUJOCO_GL=backend, **{OVERRIDE_ENV: backend})
+    env.pop("PYOPENGL_PLATFORM", None)
+    return env
+
+
+def measure_throughput(backend, frames=50, width=320, height=240, timeout=300):
+    # Each backend gets its own interpreter, a process can only ever load one GL platform
+    code = f"from gym_lowcostrobot.gl_backend import _render_worker; _render_worker({frames}, {width}, {height})"
+    command = [sys.executable, "-c", code]
+    try:
+        result = subprocess.run(
+            command, env=_backend_env(backend), capture_output=True, text=True, timeout=timeout, check=False
+        )
+    except subprocess.TimeoutExpired:
+        return {"backend": backend, "error": f"timed out after {timeout}s"}
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        return {"backend": backend, "error": lines[-1] if lines else f"exit code {result.returncode}"}
+    return {"backend": backend, **json.loads(result.stdout.strip().splitlines()[-1])}
+
+
+def benchmark(backends=BACKENDS, frames=50, width=320, height=240):
+    results = []
+    for backend in backends:
+        if is_available(backend):
+            results.append(measure_throughput(backend, frames, width, height))
+        else:
+            results.append({"backend": backend, "error": "not available on this machine"})
+    return results
+
+
+def save_preference(results):
+    working = [result for result in results if "error" not in result]
+    if not working:
+        return None
+    fastest = max(working, key=lambda result: result["fps"])
+    _save_backend(fastest["backend"], results)
+    return fastest["backend"]
+
+
+def _save_backend(backend, results):
+    PREFERENCE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    PREFERENCE_PATH.write_text(json.dumps({"backend": backend, "results": results}, indent=2))
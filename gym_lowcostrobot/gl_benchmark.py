@@ -0,0 +1,35 @@
+import argparse
+import sys
+
+from . import gl_backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure offscreen render throughput of every MuJoCo GL backend")
+    parser.add_argument("--backends", nargs="+", choices=gl_backend.BACKENDS, default=list(gl_backend.BACKENDS))
+    parser.add_argument("--frames", type=int, default=50, help="frames rendered per backend, alternating cameras")
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    parser.add_argument("--save", action="store_true", help="make the fastest backend the default on this machine")
+    args = parser.parse_args()
+
+    print(f"Selected on import: {gl_backend.selected or 'mujoco default'} ({gl_backend.source})")
+    results = gl_backend.benchmark(args.backends, args.frames, args.width, args.height)
+    print(f"{'Backend':<8} {'Frames/s':>9} {'Init (s)':>9}  GL renderer")
+    for result in results:
+        if "error" in result:
+            print(f"{result['backend']:<8} {'-':>9} {'-':>9}  failed: {result['error']}")
+        else:
+            print(f"{result['backend']:<8} {result['fps']:>9.1f} {result['init_time']:>9.2f}  {result['gl_renderer']}")
+
+    if args.save:
+        backend = gl_backend.save_preference(results)
+        if backend is None:
+            print("No backend could render, nothing saved")
+            return 1
+        print(f"Saved {backend} to {gl_backend.PREFERENCE_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import copy
+import hashlib
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import mujoco
+
+from .gl_backend import CACHE_DIR
+
+MODEL_CACHE_DIR = CACHE_DIR / "models"
+
+# Set to 0 to always compile from the XML
+DISABLE_ENV = "LOWCOSTROBOT_MODEL_CACHE"
+
+# Asset elements whose `file` attribute is resolved against a compiler directory
+_ASSET_DIRS = {"mesh": "meshdir", "skin": "meshdir", "texture": "texturedir", "hfield": "texturedir"}
+
+# Compiled models of this process by content hash, every caller gets its own copy
+_models = {}
+
+
+def _dependencies(xml_path):
+    # The model file, the files it includes and every asset they reference, paths resolved the way MuJoCo does
+    base_dir = xml_path.parent
+    xml_files = []
+    roots = []
+    pending = [xml_path]
+    while pending:
+        path = pending.pop(0)
+        root = ET.parse(path).getroot()
+        xml_files.append(path)
+        roots.append(root)
+        pending.extend(base_dir / element.get("file") for element in root.iter("include"))
+
+    # Compiler directories apply to the whole model, whichever file sets them
+    compiler = {}
+    for root in roots:
+        for element in root.iter("compiler"):
+            compiler.update(element.attrib)
+
+    asset_files = []
+    for root in roots:
+        for element in root.iter():
+            if element.tag in _ASSET_DIRS and element.get("file"):
+                directory = compiler.get(_ASSET_DIRS[element.tag], compiler.get("assetdir", ""))
+                asset_files.append(base_dir / directory / element.get("file"))
+    return xml_files + asset_files
+
+
+def model_key(xml_path):
+    # Content hash of everything the compiled model depends on, including the MuJoCo version that compiles it
+    xml_path = Path(xml_path).resolve()
+    digest = hashlib.sha256(mujoco.__version__.encode())
+    for path in _dependencies(xml_path):
+        digest.update(os.path.relpath(path, xml_path.parent).encode())
+        digest.update(path.read_bytes())
+    return f"{xml_path.stem}-{digest.hexdigest()[:32]}"
+
+
+def load_model(xml_path):
+    """
+    Loads a MuJoCo model, from a compiled binary (MJB) cached on disk when the XML and its assets did not change.
+
+    The cache is keyed by the content hash of the XML, its includes, meshes and textures, and the MuJoCo version, so
+    any edit recompiles from the XML. Models already loaded in this process are copied instead of read again.
+
+    :param xml_path: path of the model XML
+    :return: mujoco.MjModel owned by the caller
+    """
+    if os.environ.get(DISABLE_ENV, "1") == "0":
+        return mujoco.MjModel.from_xml_path(str(xml_path))
+    try:
+        key = model_key(xml_path)
+    except (OSError, ET.ParseError):
+        # Let the compiler report missing or malformed files
+        return mujoco.MjModel.from_xml_path(str(xml_path))
+
+    if key not in _models:
+        cache_path = MODEL_CACHE_DIR / f"{key}.mjb"
+        model = None
+        if cache_path.exists():
+            try:
+                model = mujoco.MjModel.from_binary_path(str(cache_path))
+            except Exception:
+                model = None
+        if model is None:
+            model = mujoco.MjModel.from_xml_path(str(xml_path))
+            _save(model, cache_path)
+        _models[key] = model
+    return copy.copy(_models[key])
+
+
+def _save(model, cache_path):
+    # Written next to its final name and renamed, concurrent workers never read a partial file
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+        os.close(fd)
+    except OSError:
+        # A read-only cache only costs the speedup
+        return
+    try:
+        mujoco.mj_saveModel(model, tmp_path, None)
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        Path(tmp_path).unlink(missing_ok=True)
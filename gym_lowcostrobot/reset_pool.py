@@ -0,0 +1,127 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import gymnasium as gym
+import mujoco
+import numpy as np
+
+from . import ASSETS_PATH, model_cache
+from .gl_backend import CACHE_DIR
+
+RESET_POOL_DIR = CACHE_DIR / "reset_pools"
+
+# Pools already loaded in this process by path and scene, every env drawing from one shares the array
+_pools = {}
+
+
+def default_path(xml_file):
+    return RESET_POOL_DIR / f"{Path(xml_file).stem}.npz"
+
+
+def _settle_states(env_id, seeds, max_settle_steps, tolerance):
+    # Runs in a worker process: place the objects like reset() does, then simulate with the arm held at rest
+    env = gym.make(env_id, observation_mode="state", action_mode="joint", render_mode=None).unwrapped
+    rest = np.zeros(env.action_space.shape)
+    states = np.empty((len(seeds), env.state_size))
+    settle_steps = np.empty(len(seeds), dtype=np.int64)
+    for i, seed in enumerate(seeds):
+        mujoco.mj_resetData(env.model, env.data)
+        env.reset(seed=int(seed))
+        for step in range(max_settle_steps):
+            env.apply_action(rest)
+            if np.abs(env.data.qvel).max() < tolerance:
+                break
+        settle_steps[i] = step + 1
+        env.get_state(out=states[i])
+    env.close()
+
+    # Episodes start at t=0 whatever time settling took, time is the first entry of the MuJoCo state
+    states[:, 0] = 0.0
+    return states, settle_steps
+
+
+def generate(env_id, size, max_settle_steps=200, tolerance=1e-3, seed=0, workers=None):
+    """
+    Simulates `size` resets of a task until their objects come to rest, across a process pool.
+
+    :param env_id: id of the registered task
+    :param size: number of states in the pool
+    :param max_settle_steps: control steps, at least 1, after which a state is kept even if something still moves
+    :param tolerance: largest joint velocity, in rad/s or m/s, at which a state counts as settled
+    :param seed: seed of the first reset, the others follow
+    :param workers: worker processes, defaults to the CPU count
+    :return: (states, settle_steps) arrays of shapes (size, state_size) and (size,)
+    """
+    workers = min(workers or os.cpu_count() or 1, size)
+    chunks = np.array_split(np.arange(seed, seed + size), workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_settle_states, env_id, chunk, max_settle_steps, tolerance) for chunk in chunks]
+        results = [future.result() for future in futures]
+    return np.concatenate([states for states, _ in results]), np.concatenate([steps for _, steps in results])
+
+
+def scene_of(env_id):
+    # Scene file a task is built on
+    env = gym.make(env_id, observation_mode="state", render_mode=None).unwrapped
+    xml_file = env.xml_file
+    env.close()
+    return xml_file
+
+
+def save(path, xml_file, states):
+    # The model key ties the pool to the assets it was simulated with
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(path, states=states, model_key=model_cache.model_key(os.path.join(ASSETS_PATH, xml_file)))
+    return path
+
+
+def load(path, xml_file, state_size):
+    """
+    Loads a pool saved by `save` for an env of the scene `xml_file`.
+
+    :raises FileNotFoundError: if there is no pool at `path`
+    :raises ValueError: if the pool was simulated with other assets or another state layout
+    """
+    path = Path(path).resolve()
+    if (path, xml_file) not in _pools:
+        with np.load(path) as pool:
+            states = pool["states"]
+            model_key = str(pool["model_key"])
+        if model_key != model_cache.model_key(os.path.join(ASSETS_PATH, xml_file)):
+            raise ValueError(f"Reset pool {path} was generated for other assets of {xml_file}, regenerate it")
+        states.setflags(write=False)
+        _pools[path, xml_file] = states
+    states = _pools[path, xml_file]
+    if states.ndim != 2 or states.shape[1] != state_size or len(states) == 0:
+        raise ValueError(f"Reset pool {path} holds states of shape {states.shape}, expected (n, {state_size})")
+    return states
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-simulate settled initial states of a task for fast resets")
+    parser.add_argument("env_id", help="registered task, e.g. LiftCube-v0")
+    parser.add_argument("--size", type=int, default=1000, help="number of states in the pool")
+    parser.add_argument("--max-settle-steps", type=int, default=200)
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="largest velocity of a settled state")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to the CPU count")
+    parser.add_argument("--output", default=None, help="defaults to the pool the env loads with reset_pool=True")
+    args = parser.parse_args()
+
+    states, settle_steps = generate(
+        args.env_id, args.size, args.max_settle_steps, args.tolerance, args.seed, args.workers
+    )
+    xml_file = scene_of(args.env_id)
+    path = save(args.output or default_path(xml_file), xml_file, states)
+    unsettled = int((settle_steps >= args.max_settle_steps).sum())
+    print(f"Saved {len(states)} states to {path}")
+    print(f"Settling took {settle_steps.mean():.1f} control steps on average, {unsettled} states hit the limit")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
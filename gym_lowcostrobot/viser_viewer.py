@@ -1,13 +1,21 @@
 # move from mujoco.viewer to viser!!
-import numpy as np
-import mujoco
-import viser
-import trimesh
 import threading
 import time
-from typing import Optional
+
+import mujoco
+import numpy as np
+import trimesh
+import viser
 from scipy.spatial.transform import Rotation
 
+# Geom types drawn from their size, as ints since numpy ints do not compare equal to the enum in a tuple lookup
+PRIMITIVE_TYPES = {
+    int(mujoco.mjtGeom.mjGEOM_BOX),
+    int(mujoco.mjtGeom.mjGEOM_SPHERE),
+    int(mujoco.mjtGeom.mjGEOM_CAPSULE),
+    int(mujoco.mjtGeom.mjGEOM_CYLINDER),
+}
+
 
 class ViserViewer:
     
@@ -16,20 +24,55 @@ class ViserViewer:
         model: mujoco.MjModel, 
         data: mujoco.MjData,
         host: str = "0.0.0.0",
-        port: int = 8080
+        port: int = 8080,
+        fps: float = 30.0,
+        position_tolerance: float = 1e-4,
+        rotation_tolerance: float = 1e-3
     ):
+        """Poses are only sent for geoms that moved more than `position_tolerance` meters or turned more than
+        `rotation_tolerance` radians since they were last sent."""
         self.model = model
         self.data = data
+        self.fps = fps
+        self.position_tolerance = position_tolerance
+        self.rotation_tolerance = rotation_tolerance
         
         self.server = viser.ViserServer(host=host, port=port)
         
         self.geom_handles = {}
         self.body_handles = {}
         
+        # Vertices and faces by shape key, and batched meshes with the geom ids of their instances
+        self._shapes = {}
+        self._instances = []
+        self._instance_batch = {}
+        
         self.cam = CameraSettings()
         
         self._setup_scene()
         
+        # Geoms welded to the world (floor, target regions) never move with the simulation, they are only sent
+        # again by sync(static=True) after a reset moved them
+        geom_ids = np.array(sorted(self.geom_handles), dtype=int)
+        static = self.model.body_weldid[self.model.geom_bodyid[geom_ids]] == 0
+        self._dynamic_ids = geom_ids[~static]
+        self._all_ids = geom_ids
+        
+        # Poses the browser shows, the handles were added at the current ones
+        self._sent_xpos = self.data.geom_xpos.copy()
+        self._sent_wxyz = np.roll(Rotation.from_matrix(self.data.geom_xmat.reshape(-1, 3, 3)).as_quat(), 1, axis=1)
+        
+        # sync() only snapshots the geom poses, a thread pushes the latest snapshot to the browser at `fps`
+        self._lock = threading.Lock()
+        self._geom_xpos = self.data.geom_xpos.copy()
+        self._geom_xmat = self.data.geom_xmat.copy()
+        self._pending = False
+        self._static_pending = False
+        self._update_warned = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sync_loop, name="ViserViewer", daemon=True)
+        self._thread.start()
+        
         print(f"Viser viewer started at http://{host}:{port}")
     
     def _setup_scene(self):
@@ -37,13 +80,61 @@ class ViserViewer:
         
         mujoco.mj_forward(self.model, self.data)
         
+        # Geoms sharing a mesh, or a primitive of the same size, upload it once as instances of one batched mesh
+        groups = {}
         for geom_id in range(self.model.ngeom):
-            self._add_geom(geom_id)
+            groups.setdefault(self._shape_key(geom_id), []).append(geom_id)
+        
+        for geom_ids in groups.values():
+            if len(geom_ids) == 1:
+                self._add_geom(geom_ids[0])
+            else:
+                self._add_instances(np.array(geom_ids))
     
-    def _add_geom(self, geom_id: int):
-        """Add a MuJoCo geometry to the Viser scene."""
+    def _shape_key(self, geom_id: int):
+        """Key of the geometry a geom draws, equal for geoms that can share one uploaded mesh."""
+        geom_type = int(self.model.geom_type[geom_id])
+        if geom_type == mujoco.mjtGeom.mjGEOM_MESH:
+            return (geom_type, int(self.model.geom_dataid[geom_id]))
+        if geom_type in PRIMITIVE_TYPES:
+            return (geom_type, tuple(self.model.geom_size[geom_id].tolist()))
+        return (geom_type,)
+    
+    def _geom_shape(self, geom_id: int):
+        """Vertices and faces of a geom in its own frame, built once per shape key."""
+        key = self._shape_key(geom_id)
+        if key in self._shapes:
+            return self._shapes[key]
+        
         geom_type = self.model.geom_type[geom_id]
         geom_size = self.model.geom_size[geom_id]
+        
+        if geom_type == mujoco.mjtGeom.mjGEOM_MESH:
+            mesh_id = self.model.geom_dataid[geom_id]
+            mesh_start = self.model.mesh_vertadr[mesh_id]
+            mesh_nvert = self.model.mesh_vertnum[mesh_id]
+            mesh_face_start = self.model.mesh_faceadr[mesh_id]
+            mesh_nface = self.model.mesh_facenum[mesh_id]
+            vertices = self.model.mesh_vert[mesh_start:mesh_start + mesh_nvert]
+            faces = self.model.mesh_face[mesh_face_start:mesh_face_start + mesh_nface]
+        else:
+            if geom_type == mujoco.mjtGeom.mjGEOM_BOX:
+                mesh = trimesh.creation.box(extents=geom_size * 2)
+            elif geom_type == mujoco.mjtGeom.mjGEOM_SPHERE:
+                mesh = trimesh.creation.icosphere(radius=geom_size[0], subdivisions=2)
+            elif geom_type == mujoco.mjtGeom.mjGEOM_CAPSULE:
+                mesh = trimesh.creation.capsule(radius=geom_size[0], height=geom_size[1] * 2)
+            elif geom_type == mujoco.mjtGeom.mjGEOM_CYLINDER:
+                mesh = trimesh.creation.cylinder(radius=geom_size[0], height=geom_size[1] * 2)
+            else:
+                mesh = trimesh.creation.icosphere(radius=0.01, subdivisions=1)
+            vertices, faces = mesh.vertices, mesh.faces
+        
+        self._shapes[key] = (vertices.astype(np.float32), faces.astype(np.uint32))
+        return self._shapes[key]
+    
+    def _add_geom(self, geom_id: int):
+        """Add a MuJoCo geometry to the Viser scene."""
         geom_rgba = self.model.geom_rgba[geom_id]
         
         geom_name = mujoco.mj_id2name(self.model, mujoco.mjtObj.mjOBJ_GEOM, geom_id)
@@ -57,71 +148,125 @@ class ViserViewer:
         quat_xyzw = rot.as_quat()  # returns [x, y, z, w]
         quat = np.array([quat_xyzw[3], quat_xyzw[0], quat_xyzw[1], quat_xyzw[2]])  # wxyz format
         
-        color = tuple(geom_rgba[:3])
+        # One color for the whole mesh instead of a color per vertex
+        color = tuple((geom_rgba[:3] * 255).astype(np.uint8).tolist())
         
         try:
-            mesh = None
-            
-            if geom_type == mujoco.mjtGeom.mjGEOM_BOX:
-                mesh = trimesh.creation.box(extents=geom_size * 2)
-                
-            elif geom_type == mujoco.mjtGeom.mjGEOM_SPHERE:
-                mesh = trimesh.creation.icosphere(radius=geom_size[0], subdivisions=2)
-                
-            elif geom_type == mujoco.mjtGeom.mjGEOM_CAPSULE:
-                mesh = trimesh.creation.capsule(radius=geom_size[0], height=geom_size[1] * 2)
-                
-            elif geom_type == mujoco.mjtGeom.mjGEOM_CYLINDER:
-                mesh = trimesh.creation.cylinder(radius=geom_size[0], height=geom_size[1] * 2)
-                
-            elif geom_type == mujoco.mjtGeom.mjGEOM_MESH:
-                mesh_id = self.model.geom_dataid[geom_id]
-                if mesh_id >= 0:
-                    mesh_start = self.model.mesh_vertadr[mesh_id]
-                    mesh_nvert = self.model.mesh_vertnum[mesh_id]
-                    mesh_vertices = self.model.mesh_vert[mesh_start:mesh_start + mesh_nvert].copy()
-                    
-                    mesh_face_start = self.model.mesh_faceadr[mesh_id]
-                    mesh_nface = self.model.mesh_facenum[mesh_id]
-                    mesh_faces = self.model.mesh_face[mesh_face_start:mesh_face_start + mesh_nface].copy()
-
-                    mesh = trimesh.Trimesh(vertices=mesh_vertices, faces=mesh_faces)
-            else:
-                mesh = trimesh.creation.icosphere(radius=0.01, subdivisions=1)
-            
-            if mesh is not None:
-                if hasattr(mesh, 'visual') and color is not None:
-                    color_uint8 = (np.array(color) * 255).astype(np.uint8)
-                    mesh.visual.vertex_colors = np.tile(color_uint8, (len(mesh.vertices), 1))
+            vertices, faces = self._geom_shape(geom_id)
+            handle = self.server.scene.add_mesh_simple(
+                name=f"/geom/{geom_name}",
+                vertices=vertices,
+                faces=faces,
+                color=color,
+                position=pos,
+                wxyz=quat
+            )
+            self.geom_handles[geom_id] = handle
                 
-                handle = self.server.scene.add_mesh_trimesh(
-                    name=f"/geom/{geom_name}",
-                    mesh=mesh,
-                    position=pos,
-                    wxyz=quat
-                )
+        except Exception as e:
+            print(f"Warning: Could not add geometry {geom_name}: {e}")
+    
+    def _add_instances(self, geom_ids: np.ndarray):
+        """Add geoms of one shape as instances of a single batched mesh, each with its own pose and color."""
+        quat_xyzw = Rotation.from_matrix(self.data.geom_xmat[geom_ids].reshape(-1, 3, 3)).as_quat()
+        colors = (self.model.geom_rgba[geom_ids, :3] * 255).astype(np.uint8)
+        name = f"/geom/instances_{len(self._instances)}"
+        
+        try:
+            vertices, faces = self._geom_shape(geom_ids[0])
+            handle = self.server.scene.add_batched_meshes_simple(
+                name=name,
+                vertices=vertices,
+                faces=faces,
+                batched_wxyzs=np.roll(quat_xyzw, 1, axis=1),
+                batched_positions=self.data.geom_xpos[geom_ids],
+                batched_colors=colors
+            )
+            for geom_id in geom_ids.tolist():
                 self.geom_handles[geom_id] = handle
+                self._instance_batch[geom_id] = len(self._instances)
+            self._instances.append((handle, geom_ids))
                 
         except Exception as e:
-            print(f"Warning: Could not add geometry {geom_name}: {e}")
+            print(f"Warning: Could not add geometry {name}: {e}")
     
-    def sync(self):
-        for geom_id, handle in self.geom_handles.items():
-            pos = self.data.geom_xpos[geom_id].copy()
-            mat = self.data.geom_xmat[geom_id].reshape(3, 3)
-            
-            rot = Rotation.from_matrix(mat)
-            quat_xyzw = rot.as_quat()  # returns [x, y, z, w]
-            quat_wxyz = np.array([quat_xyzw[3], quat_xyzw[0], quat_xyzw[1], quat_xyzw[2]])
+    def sync(self, static=False):
+        """Snapshot the current poses, cheap enough to call after every physics step.
+        
+        Pass static=True when geoms attached to the world moved, e.g. a target region placed by a reset.
+        """
+        with self._lock:
+            np.copyto(self._geom_xpos, self.data.geom_xpos)
+            np.copyto(self._geom_xmat, self.data.geom_xmat)
+            self._pending = True
+            self._static_pending |= static
+    
+    def _sync_loop(self):
+        period = 1.0 / self.fps
+        next_frame = time.perf_counter()
+        while not self._stop.wait(max(0.0, next_frame - time.perf_counter())):
+            next_frame = max(next_frame + period, time.perf_counter())
+            with self._lock:
+                if not self._pending:
+                    continue
+                geom_ids = self._all_ids if self._static_pending else self._dynamic_ids
+                geom_xpos = self._geom_xpos[geom_ids]
+                geom_xmat = self._geom_xmat[geom_ids]
+                self._pending = False
+                self._static_pending = False
+            self._push(geom_ids, geom_xpos, geom_xmat)
+    
+    def _push(self, geom_ids, geom_xpos, geom_xmat):
+        # One vectorized conversion for all geoms, scipy returns [x, y, z, w] and viser wants wxyz
+        quat_xyzw = Rotation.from_matrix(geom_xmat.reshape(-1, 3, 3)).as_quat()
+        quat_wxyz = np.roll(quat_xyzw, 1, axis=1)
+        
+        # Only send geoms that moved past the tolerances, q and -q are the same rotation so the angle turned is
+        # 2 * arccos(|q . q_sent|)
+        moved = np.linalg.norm(geom_xpos - self._sent_xpos[geom_ids], axis=1) > self.position_tolerance
+        cos_half_angle = np.abs(np.sum(quat_wxyz * self._sent_wxyz[geom_ids], axis=1))
+        moved |= cos_half_angle < np.cos(self.rotation_tolerance / 2)
+        if not moved.any():
+            return
+        geom_ids = geom_ids[moved]
+        geom_xpos = geom_xpos[moved]
+        quat_wxyz = quat_wxyz[moved]
+        self._sent_xpos[geom_ids] = geom_xpos
+        self._sent_wxyz[geom_ids] = quat_wxyz
+        
+        batches = set()
+        with self.server.atomic():
+            for geom_id, pos, quat in zip(geom_ids.tolist(), geom_xpos.tolist(), quat_wxyz.tolist()):
+                if geom_id in self._instance_batch:
+                    batches.add(self._instance_batch[geom_id])
+                    continue
+                handle = self.geom_handles[geom_id]
+                try:
+                    handle.position = pos
+                    handle.wxyz = quat
+                except (RuntimeError, ValueError) as e:
+                    self._warn_update_failed(e)
             
-            try:
-                handle.position = tuple(pos)
-                handle.wxyz = tuple(quat_wxyz)
-            except Exception as e:
-                pass
+            # A batched mesh takes the poses of all its instances at once, those that did not move keep their last one
+            for batch in batches:
+                handle, instance_ids = self._instances[batch]
+                try:
+                    handle.batched_positions = self._sent_xpos[instance_ids]
+                    handle.batched_wxyzs = self._sent_wxyz[instance_ids]
+                except (RuntimeError, ValueError) as e:
+                    self._warn_update_failed(e)
+
+    def _warn_update_failed(self, e):
+        # viser rejects writes to removed handles and malformed poses, the geom stops moving but the viewer thread
+        # keeps running, so this is only reported once
+        if not self._update_warned:
+            print(f"Warning: Could not update the viewer scene: {e}")
+            self._update_warned = True
     
     def close(self):
-        pass
+        if hasattr(self, "_thread") and self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
     
     def __del__(self):
         self.close()
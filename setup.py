@@ -9,7 +9,7 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     install_requires=[
-        "gymnasium>=0.29",
+        "gymnasium>=1.1",
         "mujoco>=3.0",
         "PyOpenGL==3.1.1a1",
         "viser>=1.0.0",
@@ -1,8 +1,14 @@
+import threading
+
 import gymnasium as gym
+import mujoco
+import numpy as np
 import pytest
 from gymnasium.utils.env_checker import check_env
 
 import gym_lowcostrobot  # noqa
+from gym_lowcostrobot.envs import SubprocessEnv
+from gym_lowcostrobot.envs.observation import LazyObservation
 
 
 @pytest.mark.parametrize("env_id", ["LiftCube-v0", "PickPlaceCube-v0", "PushCube-v0", "ReachCube-v0", "StackTwoCubes-v0"])
@@ -11,3 +17,204 @@ def test_env_check(env_id, observation_mode):
     env = gym.make(env_id, observation_mode=observation_mode)
     check_env(env, skip_render_check=True)
     env.close()
+
+
+def _count_renders(env):
+    calls = []
+    render_camera = env.unwrapped.render_camera
+
+    def counted(camera, control_step=None):
+        calls.append(camera)
+        return render_camera(camera, control_step)
+
+    env.unwrapped.render_camera = counted
+    return calls
+
+
+def test_lazy_images_render_only_when_read():
+    env = gym.make("LiftCube-v0", observation_mode="both", lazy_images=True, disable_env_checker=True)
+    renders = _count_renders(env)
+    observation, _ = env.reset(seed=0)
+    for _ in range(3):
+        observation, _, _, _, _ = env.step(env.action_space.sample())
+    assert renders == []
+    assert observation["cube_pos"].shape == (3,)
+
+    assert observation["image_front"].shape == (240, 320, 3)
+    assert renders == ["camera_front"]
+    assert dict(observation)["image_top"].shape == (240, 320, 3)
+    assert renders == ["camera_front", "camera_top"]
+
+    stale, _, _, _, _ = env.step(env.action_space.sample())
+    env.step(env.action_space.sample())
+    with pytest.raises(RuntimeError):
+        stale["image_front"]
+    env.close()
+
+
+def test_camera_images_match_a_full_scene_update_per_camera():
+    env = gym.make("LiftCube-v0", observation_mode="image", disable_env_checker=True)
+    observation, _ = env.reset(seed=0)
+    unwrapped = env.unwrapped
+    renderer = mujoco.Renderer(unwrapped.model)
+    for camera, key in (("camera_front", "image_front"), ("camera_top", "image_top")):
+        renderer.update_scene(unwrapped.data, camera=camera)
+        np.testing.assert_array_equal(observation[key], renderer.render())
+    renderer.close()
+    env.close()
+
+
+def test_lazy_observation_get_renders_pending_entries():
+    observation = LazyObservation({"cube_pos": 1}, {"image_front": lambda: "frame"})
+    assert observation.pending == {"image_front"}
+    assert observation.get("image_front") == "frame"
+    assert observation.get("image_top", "missing") == "missing"
+    assert observation.pending == set()
+
+
+def test_lazy_observation_update_replaces_pending_entries():
+    observation = LazyObservation({}, {"image_front": lambda: "rendered"})
+    observation.update({"image_front": "recorded"})
+    assert observation.pending == set()
+    assert observation["image_front"] == "recorded"
+
+
+def test_camera_render_period_holds_frames():
+    env = gym.make(
+        "LiftCube-v0", observation_mode="image", camera_render_period={"camera_front": 3}, disable_env_checker=True
+    )
+    renders = _count_renders(env)
+    env.reset(seed=0)
+    observations = [env.step(env.action_space.sample())[0] for _ in range(6)]
+    assert renders.count("camera_front") == 3
+    assert renders.count("camera_top") == 7
+    assert observations[1]["image_front"] is observations[0]["image_front"]
+    assert observations[2]["image_front"] is not observations[1]["image_front"]
+    env.close()
+
+
+def test_image_buffers_are_reused_and_match_fresh_renders():
+    fresh = gym.make("LiftCube-v0", observation_mode="image", disable_env_checker=True)
+    buffered = gym.make("LiftCube-v0", observation_mode="image", image_buffers=2, disable_env_checker=True)
+    fresh.reset(seed=0)
+    buffered.reset(seed=0)
+
+    frames = []
+    for _ in range(3):
+        action = np.zeros(6, dtype=np.float32)
+        expected, observation = fresh.step(action)[0], buffered.step(action)[0]
+        for key in ("image_front", "image_top"):
+            # Software GL is not bit-exact from one render to the next
+            assert np.abs(observation[key].astype(int) - expected[key]).max() <= 8
+        frames.append(observation["image_front"])
+
+    # Frames rotate through two buffers per camera
+    assert frames[2] is frames[0]
+    assert frames[1] is not frames[0]
+    fresh.close()
+    buffered.close()
+
+
+@pytest.mark.parametrize("env_id", ["PushCube-v0", "PushCubeLoop-v0"])
+def test_set_state_branches_reproduce_the_same_rollout(env_id):
+    env = gym.make(env_id, observation_mode="state", disable_env_checker=True).unwrapped
+    env.reset(seed=0)
+    actions = np.random.default_rng(0).uniform(-1, 1, size=(10, 6)).astype(np.float32)
+    for action in actions[:5]:
+        env.step(action)
+    state = env.get_state()
+    assert state.shape == (env.state_size,)
+
+    first = [env.step(action) for action in actions[5:]]
+    env.reset(seed=1)
+    env.set_state(state)
+    second = [env.step(action) for action in actions[5:]]
+    for (observation, reward, *_), (expected, expected_reward, *_) in zip(second, first):
+        for key in expected:
+            np.testing.assert_array_equal(observation[key], expected[key])
+        assert reward == expected_reward
+    env.close()
+
+
+def test_reset_pool_restores_settled_states(tmp_path):
+    from gym_lowcostrobot import reset_pool
+
+    states, settle_steps = reset_pool.generate("PushCube-v0", size=4, workers=1)
+    assert (settle_steps < 200).all()
+    path = reset_pool.save(tmp_path / "push_cube.npz", "push_cube.xml", states)
+
+    env = gym.make("PushCube-v0", observation_mode="state", reset_pool=path, disable_env_checker=True).unwrapped
+    for seed in range(3):
+        observation, _ = env.reset(seed=seed)
+        assert any(np.array_equal(env.get_state(), state) for state in states)
+        np.testing.assert_array_equal(observation["target_pos"], env.target_pos)
+        # Settled cubes stay where they are once the episode starts
+        cube_pos = observation["cube_pos"].copy()
+        observation, _, _, _, _ = env.step(np.zeros(6, dtype=np.float32))
+        np.testing.assert_allclose(observation["cube_pos"], cube_pos, atol=1e-4)
+    env.close()
+
+    with pytest.raises(ValueError):
+        gym.make("LiftCube-v0", observation_mode="state", reset_pool=path)
+
+
+@pytest.mark.parametrize("num_threads", [1, 2])
+def test_batched_env_matches_single_envs_and_autoresets(num_threads):
+    envs = gym.make_vec(
+        "PushCube-v0",
+        num_envs=3,
+        vectorization_mode="vector_entry_point",
+        max_episode_steps=4,
+        num_threads=num_threads,
+    )
+    single = gym.make("PushCube-v0", observation_mode="state", disable_env_checker=True).unwrapped
+    observations, _ = envs.reset(seed=0)
+    observation, _ = single.reset(seed=2)
+    assert observations["cube_pos"].shape == (3, 3)
+    np.testing.assert_array_equal(observations["target_pos"][2], observation["target_pos"])
+
+    actions = np.random.default_rng(0).uniform(-1, 1, size=(3, 6)).astype(np.float32)
+    for _ in range(4):
+        observations, rewards, terminations, truncations, _ = envs.step(actions)
+        observation, reward, _, _, _ = single.step(actions[2])
+        np.testing.assert_allclose(observations["arm_qpos"][2], observation["arm_qpos"])
+        assert rewards[2] == pytest.approx(reward)
+    assert truncations.all() and not terminations.any()
+
+    # Resets move the targets in the shared model, so they must not run on the pool threads
+    reset_threads = []
+    for world in envs.unwrapped.envs:
+
+        def reset_task(reset_task=world.reset_task):
+            reset_threads.append(threading.get_ident())
+            return reset_task()
+
+        world.reset_task = reset_task
+
+    # The step after truncation resets every world and ignores the actions
+    observations, rewards, _, truncations, _ = envs.step(actions)
+    assert reset_threads == [threading.get_ident()] * 3
+    assert not truncations.any() and (rewards == 0).all()
+    np.testing.assert_array_equal(observations["arm_qpos"], 0)
+    envs.close()
+
+
+def test_subprocess_env_renders_into_shared_observations():
+    envs = SubprocessEnv("LiftCube-v0", num_envs=2, num_workers=2, observation_mode="both", max_episode_steps=2)
+    single = gym.make("LiftCube-v0", observation_mode="both", disable_env_checker=True)
+    observations, _ = envs.reset(seed=0)
+    single.reset(seed=1)
+
+    actions = np.random.default_rng(0).uniform(-1, 1, size=(2, 6)).astype(np.float32)
+    for _ in range(2):
+        stepped, _, _, truncations, _ = envs.step(actions)
+        observation = single.step(actions[1])[0]
+        np.testing.assert_allclose(stepped["arm_qpos"][1], observation["arm_qpos"])
+        assert np.abs(stepped["image_front"][1].astype(int) - observation["image_front"]).max() <= 8
+    assert truncations.all()
+
+    # Observations are views of the shared arena, not copies
+    assert stepped["image_top"] is observations["image_top"]
+    assert stepped["image_top"].shape == (2, 240, 320, 3)
+    envs.close()
+    single.close()
@@ -0,0 +1,37 @@
+import pytest
+
+from gym_lowcostrobot import gl_backend
+
+
+def test_backend_choice_precedence(monkeypatch, tmp_path):
+    monkeypatch.setattr(gl_backend.platform, "system", lambda: "Linux")
+    monkeypatch.setattr(gl_backend, "PREFERENCE_PATH", tmp_path / "gl_backend.json")
+    monkeypatch.setattr(gl_backend, "is_available", lambda backend: backend in ("egl", "osmesa"))
+    for name in (gl_backend.OVERRIDE_ENV, "MUJOCO_GL", "PYOPENGL_PLATFORM"):
+        monkeypatch.delenv(name, raising=False)
+
+    # EGL is installed but cannot give a context, the probe falls through to OSMesa and remembers it
+    monkeypatch.setattr(gl_backend, "can_create_context", lambda backend: backend == "osmesa")
+    assert gl_backend._choose() == ("osmesa", "probe")
+    assert gl_backend._choose() == ("osmesa", str(tmp_path / "gl_backend.json"))
+    (tmp_path / "gl_backend.json").unlink()
+
+    monkeypatch.setattr(gl_backend, "can_create_context", lambda backend: True)
+    assert gl_backend._choose() == ("egl", "probe")
+
+    gl_backend.save_preference([{"backend": "egl", "fps": 10.0}, {"backend": "osmesa", "fps": 20.0}])
+    assert gl_backend._choose() == ("osmesa", str(tmp_path / "gl_backend.json"))
+
+    monkeypatch.setenv("MUJOCO_GL", "egl")
+    assert gl_backend._choose() == ("egl", "MUJOCO_GL")
+
+    monkeypatch.setenv(gl_backend.OVERRIDE_ENV, "glfw")
+    assert gl_backend._choose() == ("glfw", gl_backend.OVERRIDE_ENV)
+
+    monkeypatch.setenv(gl_backend.OVERRIDE_ENV, "wgl")
+    with pytest.raises(ValueError):
+        gl_backend._choose()
+
+
+def test_context_probe_rejects_a_broken_backend():
+    assert not gl_backend.can_create_context("not-a-backend")
@@ -0,0 +1,43 @@
+import shutil
+
+import mujoco
+import numpy as np
+
+from gym_lowcostrobot import ASSETS_PATH, model_cache
+
+
+def test_cached_model_matches_xml_and_recompiles_on_edit(monkeypatch, tmp_path):
+    assets = tmp_path / "assets"
+    shutil.copytree(ASSETS_PATH, assets)
+    monkeypatch.setattr(model_cache, "MODEL_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(model_cache, "_models", {})
+    xml_path = assets / "lift_cube.xml"
+
+    model = model_cache.load_model(xml_path)
+    assert len(list((tmp_path / "cache").glob("lift_cube-*.mjb"))) == 1
+    # A fresh process reads the binary back
+    monkeypatch.setattr(model_cache, "_models", {})
+    cached = model_cache.load_model(xml_path)
+    reference = mujoco.MjModel.from_xml_path(str(xml_path))
+    for name in ("geom_pos", "mesh_vert", "body_mass", "jnt_range"):
+        np.testing.assert_array_equal(getattr(model, name), getattr(reference, name))
+        np.testing.assert_array_equal(getattr(cached, name), getattr(reference, name))
+
+    # Every caller owns its model
+    cached.geom_pos[0] += 1.0
+    assert not np.array_equal(model_cache.load_model(xml_path).geom_pos[0], cached.geom_pos[0])
+
+    # Editing an included file or a mesh changes the key
+    key = model_cache.model_key(xml_path)
+    follower = assets / "follower.xml"
+    follower.write_text(follower.read_text().replace('angle="radian"', 'angle="radian" '))
+    assert model_cache.model_key(xml_path) != key
+    key = model_cache.model_key(xml_path)
+    mesh = next((assets / "follower_meshes").glob("*.STL"))
+    data = mesh.read_bytes()
+    mesh.write_bytes(data + b"\0")
+    assert model_cache.model_key(xml_path) != key
+    mesh.write_bytes(data)
+
+    xml_path.write_text(xml_path.read_text().replace('extent="0.6"', 'extent="0.7"'))
+    assert model_cache.load_model(xml_path).stat.extent == 0.7
@@ -0,0 +1,258 @@
+import math
+import subprocess
+import sys
+import time
+
+import gymnasium as gym
+import numpy as np
+import pytest
+
+import gym_lowcostrobot  # noqa
+from data_collection.recording import DataRecorder
+from data_collection.replay import ReplayController, load_recording
+from data_collection.replay.scheduler import PlaybackScheduler
+from data_collection.replay.validate import validate_recordings
+
+
+def _make_recording(tmp_path, lengths, with_images=True, **kwargs):
+    recorder = DataRecorder("LiftCube-v0", "keyboard", output_dir=tmp_path, journal=False, **kwargs)
+    for length in lengths:
+        recorder.start_episode()
+        for step in range(length):
+            observation = {"arm_qpos": np.full(6, step, dtype=np.float32)}
+            if with_images:
+                observation["image_front"] = np.full((240, 320, 3), step, dtype=np.uint8)
+                observation["image_top"] = np.full((240, 320, 3), 100 + step, dtype=np.uint8)
+            recorder.record_step(observation, np.full(6, step, dtype=np.float32), float(step))
+        recorder.end_episode()
+    return load_recording(recorder.save())
+
+
+def test_replay_streams_recorded_frames(tmp_path):
+    recording = _make_recording(tmp_path, [12, 5])
+    assert "images_front" in recording["episodes"][0]
+
+    controller = ReplayController(None, recording)
+    time.sleep(0.2)  # let the prefetcher fill its window
+    for step in range(12):
+        observation = {}
+        action = controller.get_action(observation)
+        assert action[0] == step
+        assert observation["image_front"][0, 0, 0] == step
+        assert observation["image_top"][0, 0, 0] == 100 + step
+
+    assert controller.should_reset()
+    time.sleep(0.2)
+    observation = {}
+    controller.get_action(observation)
+    assert observation["image_front"][0, 0, 0] == 0
+    controller.cleanup()
+
+
+def test_replay_views_live_frames_when_prefetch_is_behind(tmp_path):
+    recording = _make_recording(tmp_path, [4])
+    env = gym.make(
+        "LiftCube-v0", render_mode=None, observation_mode="both", action_mode="joint", lazy_images=True, image_buffers=2
+    ).unwrapped
+    controller = ReplayController(env, recording)
+    controller.prefetcher.get = lambda step: None
+
+    observation, _ = env.reset(seed=0)
+    for _ in range(2):
+        action = controller.get_action(observation)
+        observation, _, _, _, _ = env.step(action)
+        # What data_collection/main.py hands to the camera viewer after the step
+        viewed = controller.current_observation or observation
+        assert viewed["image_front"].shape == (240, 320, 3)
+    controller.cleanup()
+    env.close()
+
+
+def test_replay_without_images(tmp_path):
+    recording = _make_recording(tmp_path, [3], with_images=False)
+
+    controller = ReplayController(None, recording)
+    assert controller.prefetcher is None
+    observation = {}
+    controller.get_action(observation)
+    assert "image_front" not in observation
+    controller.cleanup()
+
+
+def _synthetic_recording(num_steps, dt):
+    episode = {
+        "observations": np.zeros((num_steps, 6), dtype=np.float32),
+        "actions": np.arange(num_steps, dtype=np.float32)[:, None].repeat(6, axis=1),
+        "rewards": np.zeros(num_steps, dtype=np.float32),
+        "timestamps": np.arange(num_steps) * dt,
+    }
+    return {"env_name": "LiftCube-v0", "control_method": "keyboard", "num_episodes": 1, "episodes": [episode]}
+
+
+class _SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class _ActionLog:
+    # Stands in for the env, only records the actions it is stepped with
+    def __init__(self):
+        self.actions = []
+
+    def step(self, action):
+        self.actions.append(action[0])
+
+
+def _play(controller, work=0.0, env=None):
+    # Every step costs `work` seconds of simulated time, the scheduler waits on the same clock
+    clock = _SimulatedClock()
+    controller.scheduler = PlaybackScheduler(controller.playback_speed, clock=clock, sleep=clock.sleep)
+    while not controller.should_reset():
+        action = controller.get_action({})
+        if env is not None:
+            env.step(action)
+        clock.sleep(work)
+        controller.tick()
+    return clock.now
+
+
+def test_replay_pacing_absorbs_step_cost(tmp_path):
+    controller = ReplayController(None, _synthetic_recording(26, 0.02))
+    # Each step does 10 ms of work; deadline pacing keeps the episode at its recorded 0.5 s, plus the work of the
+    # first step (before the clock anchors) and of the last one (after the last deadline)
+    elapsed = _play(controller, work=0.01)
+    assert elapsed == pytest.approx(0.52)
+
+
+def test_replay_as_fast_as_possible():
+    controller = ReplayController(None, _synthetic_recording(200, 0.02))
+    controller.playback_speed = math.inf
+    assert _play(controller) < 0.5
+    assert math.isinf(controller.target_rate())
+
+
+def test_replay_skips_frames_when_behind():
+    env = _ActionLog()
+    controller = ReplayController(env, _synthetic_recording(50, 0.01))
+    controller.skip_frames = True
+    # 30 ms of work per 10 ms step: about two out of three frames have to be dropped
+    elapsed = _play(controller, work=0.03, env=env)
+    assert elapsed < 0.6
+    assert controller.skipped_frames > 20
+    # Skipped frames are still simulated, every recorded action reaches the env in order
+    assert env.actions == list(range(50))
+
+
+def test_validate_cli_imports_without_input_devices():
+    # Headless batch machines have neither a display for pynput nor pygame
+    code = (
+        "import sys; sys.modules['pynput'] = None; sys.modules['pygame'] = None; "
+        "import data_collection.replay.validate"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_validate_recordings_reproduces_observations(tmp_path):
+    from data_collection.recording.snapshots import capture_state
+
+    env = gym.make("LiftCube-v0", render_mode=None, observation_mode="state", action_mode="joint").unwrapped
+    recorder = DataRecorder(
+        "LiftCube-v0", "keyboard", output_dir=tmp_path, journal=False, state_fn=lambda: capture_state(env)
+    )
+    env.reset(seed=0)
+    for episode in range(3):
+        # Like collection: later episodes reset without a seed and keep the velocities of the previous one
+        if episode > 0:
+            env.reset()
+        recorder.start_episode()
+        for step in range(40):
+            action = np.array([0.5, 0.3, -0.2, 0.1, 0.0, -0.5]) * min(step / 20, 1.0)
+            observation, reward, _, _, _ = env.step(action)
+            recorder.record_step(observation, action, reward)
+        recorder.end_episode()
+    filepath = recorder.save()
+    env.close()
+
+    results = validate_recordings([filepath], workers=2)
+
+    assert [result["episode"] for result in results] == [0, 1, 2]
+    for result in results:
+        assert result["num_steps"] == 40
+        assert result["from_snapshot"]
+        assert result["diverged_at"] is None
+        assert result["max_error"] < 1e-3
+
+
+def test_playback_starts_episodes_from_their_snapshot(tmp_path):
+    from data_collection.recording.snapshots import capture_state
+
+    env = gym.make("LiftCube-v0", render_mode=None, observation_mode="state", action_mode="joint").unwrapped
+    recorder = DataRecorder(
+        "LiftCube-v0", "keyboard", output_dir=tmp_path, journal=False, state_fn=lambda: capture_state(env)
+    )
+    env.reset(seed=0)
+    rng = np.random.default_rng(0)
+    for _ in range(2):
+        recorder.start_episode()
+        for _ in range(15):
+            action = rng.uniform(-0.5, 0.5, 6).astype(np.float32)
+            observation, reward, _, _, _ = env.step(action)
+            recorder.record_step(observation, action, reward)
+        recorder.end_episode()
+        env.reset()
+    recording = load_recording(recorder.save())
+
+    # Played like data_collection/main.py does, from resets that differ from the recorded ones
+    controller = ReplayController(env, recording)
+    controller.playback_speed = math.inf
+    observation, _ = env.reset(seed=1)
+    replayed = []
+    while True:
+        if controller.should_reset():
+            if controller.should_exit():
+                break
+            observation, _ = env.reset()
+        action = controller.get_action(observation)
+        observation, _, _, _, _ = env.step(action)
+        replayed.append(observation["arm_qpos"])
+    controller.cleanup()
+    env.close()
+
+    recorded = np.concatenate([episode["observations"] for episode in recording["episodes"]])
+    np.testing.assert_allclose(np.array(replayed), recorded, atol=1e-5)
+
+
+def test_seek_restores_snapshot_and_resimulates(tmp_path):
+    from data_collection.recording.snapshots import capture_state
+
+    env = gym.make("LiftCube-v0", render_mode=None, observation_mode="state", action_mode="joint")
+    recorder = DataRecorder(
+        "LiftCube-v0", "keyboard", output_dir=tmp_path, journal=False,
+        state_fn=lambda: capture_state(env), snapshot_interval=10,
+    )
+    env.reset(seed=0)
+    recorder.start_episode()
+    rng = np.random.default_rng(0)
+    for _ in range(35):
+        action = rng.uniform(-0.5, 0.5, 6).astype(np.float32)
+        observation, reward, _, _, _ = env.step(action)
+        recorder.record_step(observation, action, reward)
+    recorder.end_episode()
+    recording = load_recording(recorder.save())
+
+    episode = recording["episodes"][0]
+    assert list(episode["snapshot_steps"]) == [0, 10, 20, 30]
+
+    controller = ReplayController(env, recording)
+    for step in (27, 10, 1):
+        observation = controller.seek(step)
+        assert controller.current_step_idx == step
+        np.testing.assert_allclose(observation["arm_qpos"], episode["observations"][step - 1], atol=1e-5)
+    controller.cleanup()
+    env.close()